@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Optional
+
+import numpy as np  # type: ignore
+from tcod.console import Console
+
+
+class Timeline:
+    """Frames queued by game logic for the main loop to play back."""
+
+    def __init__(self):
+        self.frames = deque()
+        self.shown_at: Optional[float] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.frames)
+
+    def add(self, console: Console, t: float) -> None:
+        self.frames.append((console.tiles_rgb.copy(), t))
+
+    def frame(self, now: Optional[float] = None) -> Optional[np.ndarray]:
+        """The frame due at `now`, or None once everything has played."""
+        now = time.perf_counter() if now is None else now
+        while self.frames:
+            tiles, t = self.frames[0]
+            if self.shown_at is None:
+                self.shown_at = now
+                return tiles
+            if now - self.shown_at < t:
+                return tiles
+            self.frames.popleft()
+            self.shown_at = None
+        return None
+
+    def skip(self) -> None:
+        self.frames.clear()
+        self.shown_at = None
@@ -0,0 +1,294 @@
+"""Headless benchmarks for the game loop, printed as JSON.
+
+    python -m basilisk.bench turns [--floors 10] [--turns-per-floor 200] [--seed 0]
+                                   [--game-mode default] [--planner-workers 0]
+    python -m basilisk.bench codecs [--turns 300] [--seed 0]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+import numpy as np
+import tcod
+
+from basilisk import actions, codec, input_handlers, setup_game
+from basilisk.components.status_effect import Shielded
+from basilisk.engine import Engine
+from basilisk.input_handlers import EventHandler
+from basilisk.planner import IntentPlanner
+
+import utils
+
+
+# (owner, method name) pairs timed on every turn. Phases nest: handle_action
+# contains handle_enemy_turns and update_fov, and handle_enemy_turns contains
+# save_turn_snapshot.
+PHASES = [
+    (EventHandler, "handle_action"),
+    (Engine, "handle_enemy_turns"),
+    (Engine, "update_fov"),
+    (Engine, "save_turn_snapshot"),
+]
+
+
+@contextmanager
+def timed_phases(timings: Dict[str, float]):
+    """Accumulate wall time spent in each of PHASES into `timings`."""
+    originals = []
+
+    for owner, name in PHASES:
+        original = getattr(owner, name)
+        originals.append((owner, name, original))
+
+        def timed(*args, _original=original, _name=name, **kwargs):
+            start = time.perf_counter()
+            try:
+                return _original(*args, **kwargs)
+            finally:
+                timings[_name] += time.perf_counter() - start
+
+        setattr(owner, name, timed)
+
+    try:
+        yield
+    finally:
+        for owner, name, original in originals:
+            setattr(owner, name, original)
+
+
+@contextmanager
+def scratch_resources():
+    """Point saves, snapshots and settings at a throwaway directory."""
+    resourcedir = utils.resourcedir
+    scratch = tempfile.mkdtemp(prefix="basilisk-bench-")
+    words = os.path.join(resourcedir, "words.txt")
+    if os.path.exists(words):
+        shutil.copy(words, scratch)
+    utils.resourcedir = scratch
+    try:
+        yield scratch
+    finally:
+        utils.resourcedir = resourcedir
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max of `samples` (seconds), in milliseconds."""
+    if not samples:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+
+def next_step(engine: Engine) -> Tuple[int, int]:
+    """Direction of the player's next step toward the downstairs, or (0, 0)."""
+    gm = engine.game_map
+    player = engine.player
+    dest_x, dest_y = gm.downstairs_location
+
+    cost = np.array(gm.tiles["snakeable"], dtype=np.int8)
+    for entity in gm.entities:
+        if entity is player or not entity.blocks_movement or not cost[entity.x, entity.y]:
+            continue
+        if entity.xy != (dest_x, dest_y):
+            cost[entity.x, entity.y] += 10
+
+    graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
+    pathfinder = tcod.path.Pathfinder(graph)
+    pathfinder.add_root(player.xy)
+    path = pathfinder.path_to((dest_x, dest_y))[1:].tolist()
+
+    if not path:
+        return (0, 0)
+    return (path[0][0] - player.x, path[0][1] - player.y)
+
+
+def take_turn(handler: EventHandler, engine: Engine) -> None:
+    """Have the scripted player act until a turn has passed."""
+    player = engine.player
+    dx, dy = next_step(engine)
+
+    if (dx, dy) != (0, 0):
+        result = handler.handle_action(actions.BumpAction(player, dx, dy))
+        if isinstance(result, input_handlers.BaseEventHandler):
+            # several items underfoot: pick them all up in whatever order
+            items = [i for i in engine.game_map.items if i.xy == player.xy and i not in player.inventory.items]
+            result = handler.handle_action(actions.PickupAction(player, items))
+        if result is True:
+            return
+
+    handler.handle_action(actions.WaitAction(player))
+
+
+def bench_turns(floors: int, turns_per_floor: int, seed: int, game_mode: str = "default", planner_workers: int = 0) -> dict:
+    """Drive a scripted, shielded player through `floors` floors headlessly."""
+    random.seed(seed)
+
+    with scratch_resources():
+        meta = setup_game.Meta()
+        engine = setup_game.new_game(meta, None, None)
+        handler = input_handlers.MainGameEventHandler(engine)
+
+        if game_mode != "default":
+            engine.game_world.game_mode = game_mode
+            engine.game_world.generate_floor()
+            engine.update_fov()
+        if planner_workers:
+            engine.planner = IntentPlanner(planner_workers)
+
+        # keep the run going regardless of what the enemies do
+        Shielded(99999, engine.player)
+
+        latencies: List[float] = []
+        phase_samples: Dict[str, List[float]] = defaultdict(list)
+        per_floor = []
+        died_on = None
+
+        timings: Dict[str, float] = defaultdict(float)
+
+        started = time.perf_counter()
+        for floor in range(1, floors + 1):
+            if floor > 1:
+                engine.game_world.generate_floor()
+                engine.update_fov()
+            actors = len(engine.game_map.actors)
+
+            floor_latencies = []
+            for _ in range(turns_per_floor):
+                timings.clear()
+                turn = engine.turn_count
+
+                start = time.perf_counter()
+                with timed_phases(timings):
+                    while engine.turn_count == turn and engine.player.is_alive:
+                        take_turn(handler, engine)
+                elapsed = time.perf_counter() - start
+
+                latencies.append(elapsed)
+                floor_latencies.append(elapsed)
+                for _, name in PHASES:
+                    phase_samples[name].append(timings[name])
+
+                if not engine.player.is_alive:
+                    died_on = floor
+                    break
+
+            per_floor.append({
+                "floor": floor,
+                "actors": actors,
+                "turns": len(floor_latencies),
+                "turns_per_sec": round(len(floor_latencies) / sum(floor_latencies), 2) if floor_latencies else 0.0,
+                **percentiles(floor_latencies),
+            })
+
+            if died_on:
+                break
+        total = time.perf_counter() - started
+
+        if engine.planner:
+            engine.planner.shutdown()
+        engine.close()
+
+    return {
+        "benchmark": "turns",
+        "seed": seed,
+        "game_mode": game_mode,
+        "planner_workers": planner_workers,
+        "floors": floors,
+        "turns_per_floor": turns_per_floor,
+        "turns": len(latencies),
+        "elapsed_s": round(total, 4),
+        "turns_per_sec": round(len(latencies) / sum(latencies), 2) if latencies else 0.0,
+        "latency": percentiles(latencies),
+        "phases": {
+            name: {"total_s": round(sum(samples), 4), **percentiles(samples)}
+            for name, samples in phase_samples.items()
+        },
+        "per_floor": per_floor,
+        "died_on_floor": died_on,
+    }
+
+
+def bench_codecs(turns: int, seed: int) -> dict:
+    """Time and size every save codec on a game `turns` turns in."""
+    random.seed(seed)
+
+    with scratch_resources():
+        engine = setup_game.new_game(setup_game.Meta(), None, None)
+        handler = input_handlers.MainGameEventHandler(engine)
+        Shielded(99999, engine.player)
+        while engine.turn_count < turns and engine.player.is_alive:
+            take_turn(handler, engine)
+        data = engine.dumps()
+        engine.close()
+
+    results = {}
+    for name, c in codec.CODECS.items():
+        start = time.perf_counter()
+        compressed = c.compress(data)
+        encoded = time.perf_counter() - start
+
+        start = time.perf_counter()
+        codec.DECOMPRESSORS[c.family](compressed)
+        decoded = time.perf_counter() - start
+
+        results[name] = {
+            "bytes": len(compressed),
+            "ratio": round(len(data) / len(compressed), 2),
+            "encode_ms": round(encoded * 1000, 3),
+            "decode_ms": round(decoded * 1000, 3),
+        }
+
+    return {
+        "benchmark": "codecs",
+        "seed": seed,
+        "turns": turns,
+        "raw_bytes": len(data),
+        "codecs": results,
+        "choices": codec.choices,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m basilisk.bench", description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    turns = subparsers.add_parser("turns", help="turn throughput and latency across all floors")
+    turns.add_argument("--floors", type=int, default=10)
+    turns.add_argument("--turns-per-floor", type=int, default=200)
+    turns.add_argument("--seed", type=int, default=0)
+    turns.add_argument("--game-mode", default="default", help="e.g. 'mongoose testing' for a crowded floor")
+    turns.add_argument("--planner-workers", type=int, default=0, help="plan enemy intents on this many threads")
+
+    codecs = subparsers.add_parser("codecs", help="size and speed of each save codec on a real game")
+    codecs.add_argument("--turns", type=int, default=300)
+    codecs.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args(argv)
+
+    if args.benchmark == "turns":
+        result = bench_turns(args.floors, args.turns_per_floor, args.seed, args.game_mode, args.planner_workers)
+    elif args.benchmark == "codecs":
+        result = bench_codecs(args.turns, args.seed)
+
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Compression for everything the game writes to disk, behind a format header."""
+from __future__ import annotations
+
+import bz2
+import lzma
+import zlib
+from typing import Callable, Dict, NamedTuple
+
+
+MAGIC = b"BSLK"
+
+
+class Codec(NamedTuple):
+    family: int
+    compress: Callable[[bytes], bytes]
+
+
+# the family byte in the header -> how to undo it
+DECOMPRESSORS: Dict[int, Callable[[bytes], bytes]] = {
+    0: bytes,
+    1: zlib.decompress,
+    2: bz2.decompress,
+    3: lzma.decompress,
+}
+
+CODECS: Dict[str, Codec] = {
+    "none": Codec(0, bytes),
+    "zlib-fast": Codec(1, lambda data: zlib.compress(data, 1)),
+    "zlib": Codec(1, lambda data: zlib.compress(data, 6)),
+    "bz2": Codec(2, lambda data: bz2.compress(data, 9)),
+    "lzma-fast": Codec(3, lambda data: lzma.compress(data, preset=0)),
+    "lzma": Codec(3, lambda data: lzma.compress(data, preset=6)),
+    "lzma-max": Codec(3, lambda data: lzma.compress(data, preset=9 | lzma.PRESET_EXTREME)),
+}
+
+choices: Dict[str, str] = {
+    "snapshots": "zlib-fast",
+    "savegames": "lzma-max",
+    "meta": "zlib",
+}
+
+
+def encode(data: bytes, kind: str) -> bytes:
+    """Compress `data` with the codec chosen for `kind` of file."""
+    codec = CODECS[choices[kind]]
+    return MAGIC + bytes([codec.family]) + codec.compress(data)
+
+
+def decode(data: bytes) -> bytes:
+    """Undo `encode`, whichever codec it used."""
+    if not data.startswith(MAGIC):
+        return lzma.decompress(data)
+    family = data[len(MAGIC)]
+    if family not in DECOMPRESSORS:
+        raise ValueError(f"Unknown save codec {family}")
+    return DECOMPRESSORS[family](data[len(MAGIC)+1:])
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from typing import Set, TYPE_CHECKING
+
+from basilisk.actions import BumpAction
+from basilisk.components.ai import Statue
+
+if TYPE_CHECKING:
+    from basilisk.engine import Engine
+    from basilisk.entity import Actor
+
+
+class CombatTracker:
+    """Keeps Engine.in_combat and Engine.can_see_enemies up to date as things happen."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.game_map = None
+        self.threats: Set[Actor] = set()
+        self.seen: Set[Actor] = set()
+
+    @property
+    def in_combat(self) -> bool:
+        self.sync()
+        return bool(self.threats) or bool(self.seen)
+
+    @property
+    def can_see_enemies(self) -> bool:
+        self.sync()
+        return bool(self.seen)
+
+    def sync(self) -> None:
+        """Start over whenever the engine moves to another map."""
+        if self.engine.game_map is self.game_map:
+            return
+        self.game_map = self.engine.game_map
+        self.threats.clear()
+        self.seen.clear()
+        for actor in self.game_map.actors:
+            self.refresh(actor)
+
+    def refresh(self, actor: Actor) -> None:
+        self.sync()
+        if actor is self.engine.player:
+            return
+
+        intent = actor.ai._intent if actor.ai else None
+        if (
+            intent and
+            any(isinstance(i,BumpAction) for i in intent) and
+            actor.name != "Decoy" and
+            actor in self.game_map.entities
+        ):
+            self.threats.add(actor)
+        else:
+            self.threats.discard(actor)
+
+        if self.is_seen(actor):
+            self.seen.add(actor)
+        else:
+            self.seen.discard(actor)
+
+    def refresh_seen(self) -> None:
+        self.sync()
+        self.seen = {actor for actor in self.game_map.actors if self.is_seen(actor)}
+
+    def is_seen(self, actor: Actor) -> bool:
+        gm = self.game_map
+        return (
+            actor.is_alive and
+            actor is not self.engine.player and
+            actor in gm.entities and
+            not isinstance(actor.ai,Statue) and
+            (gm.visible[actor.x,actor.y] or gm.smellable(actor,True))
+        )
@@ -7,6 +7,7 @@ from typing import List, Optional, Tuple, TYPE_CHECKING
 import numpy as np  # type: ignore
 import tcod
 
+from basilisk.distance_field import UNREACHABLE
 from basilisk.exceptions import Impossible
 
 from basilisk.actions import Action, BumpAction, MeleeAction, MovementAction, WaitAction
@@ -23,21 +24,23 @@ class BaseAI(Action):
 
     @property
     def intent(self) -> Optional[List[Action]]:
+        self.plan()
+        return self._intent
+
+    def plan(self) -> None:
+        """Decide an intent unless there already is one."""
         if self._intent:
-            return self._intent
+            return
         self.decide()
-        return self._intent
+        self.engine.combat.refresh(self.entity)
 
     @property
     def fov(self):
-        return tcod.map.compute_fov(
-            self.engine.game_map.tiles["transparent"],
-            (self.entity.x, self.entity.y),
-            radius=8,
-        )
+        return self.engine.game_map.fov_from(self.entity.x, self.entity.y, 8)
 
     def clear_intent(self):
         self._intent = None
+        self.engine.combat.refresh(self.entity)
 
     def decide(self) -> Optional[Action]:
         raise NotImplementedError()
@@ -47,7 +50,11 @@ class BaseAI(Action):
         for i in self.intent[:]:
             try:
                 # animate moves
-                if self.engine.fov[self.entity.x,self.entity.y] and not isinstance(i,WaitAction):
+                if (
+                    not self.engine.headless and
+                    self.engine.fov[self.entity.x,self.entity.y] and
+                    not isinstance(i,WaitAction)
+                ):
                     self.engine.animation_beat(t)
                     self.intent.pop(0)
                 i.perform()
@@ -55,7 +62,7 @@ class BaseAI(Action):
                     break
             except Impossible:
                 break
-        self._intent = None
+        self.clear_intent()
 
     def get_path_to(self, dest_x: int, dest_y: int, path_cost:int = 10, walkable=True) -> List[Tuple[int, int]]:
         """Compute and return a path to the target position.
@@ -89,12 +96,24 @@ class BaseAI(Action):
         # Convert from List[List[int]] to List[Tuple[int, int]].
         return [(index[0], index[1]) for index in path]
 
+    def get_path_to_nearest(self, roots: List[Tuple[int, int]], path_cost:int = 10) -> List[Tuple[int, int]]:
+        """Compute and return a path to the cheapest of `roots` to reach, or an empty list."""
+        x, y = self.entity.xy
+        field = self.engine.distance_fields.get(self.entity.gamemap, roots, path_cost)
+        if field.distance[x, y] == UNREACHABLE:
+            return []
+
+        path: List[List[int]] = field.path_from((x, y))[1:].tolist()
+        return [(index[0], index[1]) for index in path]
+
 
 
 
 
 class HostileEnemy(BaseAI):
 
+    _found = None
+
     def __init__(self, entity: Actor,):
         super().__init__(entity)
         self.path: List[Tuple[int, int]] = None
@@ -114,50 +133,53 @@ class HostileEnemy(BaseAI):
         dy = ty-self.entity.y
         return max(abs(dx),abs(dy))
 
-    def pick_target(self):
-        fov = tcod.map.compute_fov(
-            self.engine.game_map.tiles["transparent"],
-            (self.entity.x, self.entity.y),
-            radius=8,
-        )
+    def find_target(self):
+        """Return (target, path, xy) to go after, changing nothing; all None if nowhere."""
+        fov = self.fov
 
-        # pick the first thing in fov that you can path to:
+        # pick the first kind of thing in fov that you can path to:
             # a decoy
-            # the nearest of the player or its parts
-                # if you are seeing the player after not being in attack mode, send the notice message
+            # the snake or its parts
             # the last place you saw a player or its parts
+        # and head for the nearest one of that kind that's in fov
 
-        # set last_target to whatever you pick
+        decoys = [e for e in self.engine.game_map.entities if e.name == "Decoy"]
+        snake = [self.engine.player] + self.engine.player.inventory.items
 
-        target = None
-        
-        for entity in self.engine.game_map.entities:
-            if entity.name == "Decoy" and fov[entity.x,entity.y]:
-                d = len(self.get_path_to(*entity.xy))
-                if d:
-                    self.last_target = entity.xy
-                    return (entity,d,entity.xy)
-
-        d_to_t = 0
-        for entity in [self.engine.player] + self.engine.player.inventory.items:
-            if fov[entity.x,entity.y]:
-                d = len(self.get_path_to(*entity.xy))
-                if d and (not d_to_t or d_to_t > d):
-                    d_to_t = d
-                    target = entity
-        if target:
-            if not self.last_target:
-                self.engine.message_log.add_message(f"The ? spotted you!", color.offwhite, self.entity.name, self.entity.color)
-            self.last_target = target.xy
-            return (target,d_to_t,target.xy)
+        for targets in (decoys, snake):
+            targets = [e for e in targets if fov[e.x,e.y]]
+            if not targets:
+                continue
+            path = self.get_path_to_nearest([e.xy for e in targets])
+            if not path:
+                continue
+            target = next(e for e in targets if e.xy == path[-1])
+            return (target, path, target.xy)
 
         if self.last_target:
-            d = len(self.get_path_to(*self.last_target))
-            if d:
-                return (None, d, self.last_target)
+            path = self.get_path_to(*self.last_target)
+            if path:
+                return (None, path, self.last_target)
 
         return (None, None, None)
 
+    def pick_target(self):
+        # use a target found ahead of time by the engine's planner, if any
+        found, self._found = self._found, None
+        target, path, xy = found or self.find_target()
+
+        # if you are seeing the player after not being in attack mode, send the notice message
+        # set last_target to whatever you pick
+        if target and not self.last_target and (
+            target is self.engine.player or target in self.engine.player.inventory.items
+        ):
+            self.engine.message_log.add_message(f"The ? spotted you!", color.offwhite, self.entity.name, self.entity.color)
+        if target:
+            self.last_target = target.xy
+
+        self.path = path
+        return (target, len(path) if path else None, xy)
+
 
     def decide(self) -> Optional[Action]:
         self._intent = []
@@ -172,8 +194,6 @@ class HostileEnemy(BaseAI):
         if distance == 1:
             self._intent.append(BumpAction(self.entity, xy[0]-x, xy[1]-y))
             return
-        
-        self.path = self.get_path_to(xy[0], xy[1])
 
         if self.path:
             next_move = self.path[0:self.move_speed]
@@ -220,7 +240,7 @@ class Constricted(BaseAI):
             self.engine.message_log.add_message(f"The {self.entity.name} is no longer constricted.", color.offwhite)
             self.entity.char = self.entity.base_char
             self.entity.ai = self.previous_ai
-            self.entity.ai._intent = None
+            self.entity.ai.clear_intent()
 
 class ConfusedEnemy(BaseAI):
     description = "confused"
@@ -268,6 +288,7 @@ class ConfusedEnemy(BaseAI):
                 f"The {self.entity.name} is no longer confused.", color.offwhite
             )
             self.entity.ai = self.previous_ai
+            self.engine.combat.refresh(self.entity)
             return
         
         self.turns_remaining -= 1
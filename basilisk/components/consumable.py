@@ -144,6 +144,8 @@ class Consumable(BaseComponent):
             st = status(self.MIND, action.target_actor)
 
     def animate_explosion(self,origin,radius,colors):
+        if self.engine.headless:
+            return
         self.engine.mouse_location = (0,0)
         x, y = origin
         console = self.engine.console
@@ -246,6 +248,8 @@ class Projectile(Consumable):
             self.engine.message_log.add_message("Nothing happens.", color.grey)
 
     def animate_projectile(self,t,tile,c,char=None):
+        if self.engine.headless:
+            return
         x,y = tile
         char = char or self.parent.char
         self.engine.console.print(x,y,char)
@@ -288,6 +292,8 @@ class Projectile(Consumable):
         return new_path
 
     def animate_projectile_path(self,t,tile,c=color.b_bile):
+        if self.engine.headless:
+            return
         # self.engine.animation_beat(0,render=True)
 
         def color_tile(xy):
@@ -442,7 +448,7 @@ class EntanglingConsumable(Projectile):
                         self.engine.game_map.tile_is_walkable(xi,yi) and
                         not self.engine.game_map.tiles[xi,yi] in (tile_types.down_stairs)
                     ):
-                        self.engine.game_map.tiles[(xi,yi)] = tile_types.snake_only
+                        self.engine.game_map.set_tile(xi,yi,tile_types.snake_only)
             self.engine.animation_beat(0.06)
 
         self.engine.message_log.add_message("The ground turns to snakestone -- only you can traverse it.")
@@ -712,7 +718,7 @@ class DrillingProjectile(Projectile):
                 self.engine.message_log.add_message(f"It drills through the ?!", color.offwhite, actor.name, actor.color)
 
             if not gm.tiles['walkable'][tile[0],tile[1]]:
-                gm.tiles[tile[0],tile[1]] = tile_types.floor
+                gm.set_tile(tile[0],tile[1],tile_types.floor)
                 self.engine.message_log.add_message("It drills through the dungeon wall!", color.offwhite)
 
 
@@ -756,6 +762,8 @@ class DamageAllConsumable(Consumable):
         return [("rain acid on all nearby enemies, ",color.offwhite), (d,color.bile), (" dmg",color.offwhite)]
 
     def animate(self):
+        if self.engine.headless:
+            return
         gm = self.engine.game_map
         tiles = []
         console = self.engine.console
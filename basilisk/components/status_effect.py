@@ -33,9 +33,11 @@ class StatusEffect(BaseComponent):
 
 	def apply(self):
 		self.parent.statuses.append(self)
+		self.engine.scheduler.wake(self.parent)
 
 	def remove(self):
 		self.parent.statuses.remove(self)
+		self.engine.scheduler.wake(self.parent)
 		if self.label and self.parent is self.engine.player:
 			self.engine.message_log.add_message(f"You are no longer {self.description}.", color.yellow)
 		elif self.label:
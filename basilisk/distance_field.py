@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Iterable, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+import tcod
+
+if TYPE_CHECKING:
+    from basilisk.game_map import GameMap
+
+
+UNREACHABLE = np.iinfo(np.int32).max
+
+DIRECTIONS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+
+
+def shifted(a: np.ndarray, dx: int, dy: int) -> np.ndarray:
+    """`a` moved by (dx, dy), so out[x, y] == a[x-dx, y-dy]; zero-filled."""
+    out = np.zeros_like(a)
+    w, h = a.shape
+    out[max(dx, 0):w+min(dx, 0), max(dy, 0):h+min(dy, 0)] = a[max(-dx, 0):w+min(-dx, 0), max(-dy, 0):h+min(-dy, 0)]
+    return out
+
+
+class DistanceFields:
+    """LRU cache of Dijkstra maps on one GameMap, keyed by their root tiles."""
+
+    def __init__(self, size: int = 8):
+        self.size = size
+        self.game_map = None
+        self.version = None
+        self.fields = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, game_map: GameMap, roots: Iterable[Tuple[int, int]], path_cost: int = 10) -> tcod.path.Pathfinder:
+        with self.lock:
+            return self._get(game_map, roots, path_cost)
+
+    def _get(self, game_map: GameMap, roots: Iterable[Tuple[int, int]], path_cost: int) -> tcod.path.Pathfinder:
+        blockers = tuple(sorted(e.xy for e in game_map.entities if e.blocks_movement))
+        version = (game_map.tiles_version, blockers)
+        if game_map is not self.game_map or version != self.version:
+            self.game_map = game_map
+            self.version = version
+            self.fields.clear()
+
+        walkable = game_map.tiles["walkable"]
+        # an unwalkable target can't be pathed to at all
+        roots = tuple(sorted({r for r in roots if walkable[r]}))
+
+        key = (roots, path_cost)
+        field = self.fields.get(key)
+        if field is not None:
+            self.fields.move_to_end(key)
+            return field
+
+        cost = np.array(walkable, dtype=np.int8)
+        for x, y in blockers:
+            if cost[x, y] and (x, y) not in roots:
+                cost[x, y] += path_cost
+
+        # The search runs outward from the roots, backwards along the way an
+        # enemy would walk, so each step has to cost what the tile it leaves
+        # costs to enter. That keeps distances identical to get_path_to's.
+        graph = tcod.path.CustomGraph(cost.shape, order="F")
+        for dx, dy in DIRECTIONS:
+            graph.add_edge((dx, dy), 4 if dx and dy else 3, cost=shifted(cost, dx, dy))
+        field = tcod.path.Pathfinder(graph)
+        for root in roots:
+            field.add_root(root)
+        field.resolve()
+
+        self.fields[key] = field
+        if len(self.fields) > self.size:
+            self.fields.popitem(last=False)
+        return field
@@ -1,25 +1,31 @@
 from __future__ import annotations
 
-import lzma
-import pickle
-import os
-import time
+import contextlib
 
-from typing import TYPE_CHECKING
+from typing import Optional, Tuple, TYPE_CHECKING
 
 from tcod.console import Console
-from tcod.map import compute_fov
 
-from basilisk import exceptions, render_functions
-from basilisk.actions import WaitAction, BumpAction
+from basilisk import exceptions, pickling, render_functions, save_schema
+from basilisk.actions import WaitAction
 from basilisk.message_log import MessageLog
 from basilisk.components.status_effect import PetrifEyes, Petrified, PhasedOut
 import basilisk.color as color
-from basilisk.components.ai import Constricted, Statue
+from basilisk.components.ai import Constricted
 from basilisk.render_order import RenderOrder
 from basilisk.exceptions import Impossible
 from basilisk.components.consumable import TimeReverseConsumable
 from basilisk.entity import Actor
+from basilisk.animation import Timeline
+from basilisk.combat_tracker import CombatTracker
+from basilisk.distance_field import DistanceFields
+from basilisk.fov import FovCache
+from basilisk.journal import Entry, Journal
+from basilisk.planner import IntentPlanner
+from basilisk.profiler import TurnProfiler
+from basilisk.scheduler import EnemyScheduler
+from basilisk.snapshots import SnapshotRing
+from basilisk.writer import get_writer, write_encoded
 
 if TYPE_CHECKING:
     from basilisk.game_map import GameMap, GameWorld
@@ -30,8 +36,31 @@ import utils
 class Engine:
     game_map: GameMap
     game_world: GameWorld
+    profiler: Optional[TurnProfiler] = None
+    _fov_cache: Optional[FovCache] = None
+    _distance_fields: Optional[DistanceFields] = None
+    planner: Optional[IntentPlanner] = None
+    _timeline: Optional[Timeline] = None
+    _snapshots: Optional[SnapshotRing] = None
+    _combat: Optional[CombatTracker] = None
+    _scheduler: Optional[EnemyScheduler] = None
+    _journal: Optional[Journal] = None
+    # turn of the last checkpoint, and how many messages and history entries
+    # it and the journal hold
+    _checkpoint_turn: Optional[int] = None
+    _journaled: Optional[Tuple[int, int]] = None
+
+    # turns between checkpoint saves; the journal covers the ones in between
+    checkpoint_every = 100
+
+    # session-only state left out of saves and snapshots
+    transient = (
+        "meta", "terminal", "console", "profiler", "planner",
+        "_timeline", "_snapshots", "_fov_cache", "_distance_fields", "_combat", "_scheduler",
+        "_journal", "_checkpoint_turn", "_journaled",
+    )
  
-    def __init__(self, player: Actor, meta, terminal, console):
+    def __init__(self, player: Actor, meta, terminal=None, console=None):
         self.message_log = MessageLog(self)
         self.mouse_location = (0, 0)
         self.player = player
@@ -62,6 +91,15 @@ class Engine:
         self._show_instructions = self.meta.c_controls = new_val
 
     # field of view
+    def toggle_profiler(self):
+        self.profiler = None if self.profiler else TurnProfiler()
+
+    def profile(self, phase, ai=None):
+        """Time `phase` of the current turn if the profiler is on."""
+        if not self.profiler:
+            return contextlib.nullcontext()
+        return self.profiler.phase(phase, ai)
+
     @property
     def fov_radius(self):
         return 8 + self.player.TONG
@@ -76,20 +114,34 @@ class Engine:
     def foi_radius(self):
         return 0 + self.player.TONG
 
+    # no terminal or console to draw to: skip all animation and rendering
+    @property
+    def headless(self):
+        return self.terminal is None or self.console is None
+
     @property
     def help_text(self):
         return render_functions.full_help_text
 
+    @property
+    def combat(self):
+        if not self._combat:
+            self._combat = CombatTracker(self)
+        return self._combat
+
+    @property
+    def scheduler(self):
+        if not self._scheduler:
+            self._scheduler = EnemyScheduler(self)
+        return self._scheduler
+
     @property
     def in_combat(self):
-        for a in self.game_map.actors:
-            if a.ai.intent and any(isinstance(i,BumpAction) for i in a.ai.intent) and a.name not in ["Decoy","Basilisk"]:
-                return True
-        return self.can_see_enemies
+        return self.combat.in_combat
 
     @property
     def can_see_enemies(self):
-        return len([a for a in self.fov_actors if not isinstance(a.ai,Statue)]) > 0
+        return self.combat.can_see_enemies
 
     @property
     def an_enemy_is_constricted(self):
@@ -106,12 +158,28 @@ class Engine:
 
         t = 0.5/turns
 
-        for i in reversed(range(turn,self.turn_count)):
-            with open(utils.get_resource(f"snapshot_{i}.sav"), "rb") as f:
-                engine = pickle.loads(lzma.decompress(f.read()))
+        # recent snapshots may still be on their way into the ring
+        self.writer.flush()
+        if self.snapshots:
+            turn = max(turn, next(iter(self.snapshots)))
+
+        if turn in self.snapshots and turn < self.turn_count:
+            # turns on the way back are only drawn, from their stored views
+            if not self.headless:
+                self.console.clear()
+                self.render(self.console)
+            for i, layers, view in self.snapshots.rewind(turn + 1):
+                if not self.headless:
+                    render_functions.render_snapshot_view(self.console, layers, view)
+                    self.animation_beat(t, render=False)
+
+            # and only the one arrived at is unpickled
+            data, layers = self.snapshots[turn]
+            engine = pickling.loads(data, self.run_objects)
             assert isinstance(engine, Engine)
+            for name, layer in layers.items():
+                setattr(engine.game_map, name, layer)
             engine.game_map._next_id = self.game_map._next_id
-            engine.game_map.item_factories = self.game_map.item_factories
             self.game_map = engine.game_map
             self.game_map.engine = self
             self.player = engine.player
@@ -127,12 +195,106 @@ class Engine:
                 i.consume()
 
         self.check_word_mode()
+        self.plan_intents()
         self.just_turned_back_time = True
 
 
+    @property
+    def writer(self):
+        return get_writer()
+
+    @property
+    def snapshots(self):
+        if self._snapshots is None:
+            self._snapshots = SnapshotRing(directory=utils.resourcedir)
+        return self._snapshots
+
     def save_turn_snapshot(self):
-        self.save_as(utils.get_resource(f"snapshot_{self.turn_count}.sav"))
-        utils.del_old_snapshots(self.turn_count)
+        # the map's layers go into the ring as deltas, and the message log
+        # and history only grow and are kept as they are by turn_back_time,
+        # so pickle everything else
+        gm = self.game_map
+        held = {(gm, name): getattr(gm, name) for name in gm.layers}
+        held[self.message_log, "messages"] = self.message_log.messages
+        held[self, "history"] = self.history
+        for obj, name in held:
+            setattr(obj, name, None)
+        try:
+            data = self.dumps(self.run_objects)
+        finally:
+            for (obj, name), value in held.items():
+                setattr(obj, name, value)
+        # diffing happens on the writer thread, against copies taken now
+        layers = {name: held[gm, name].copy(order="K") for name in gm.layers}
+        self.writer.submit(self.snapshots.add, self.turn_count, data, layers, gm.snapshot_view())
+        self.journal_turn(data, layers)
+
+    @property
+    def journal(self):
+        if self._journal is None:
+            self._journal = Journal(utils.get_resource(Journal.default_filename))
+        return self._journal
+
+    def journal_turn(self, data: bytes, layers: dict):
+        """Journal this turn, or save a checkpoint every `checkpoint_every` turns."""
+        if self._journaled is None or self.turn_count - self._checkpoint_turn >= self.checkpoint_every:
+            # built from the turn's snapshot on the writer thread, so the
+            # turn only pays for copying what the snapshot leaves out
+            items = self.game_map.item_factories
+            self.writer.submit(
+                write_checkpoint, utils.get_resource("savegame.sav"), data, layers,
+                list(self.message_log.messages), list(self.history), [list(items), *items]
+            )
+            self.writer.submit(self.snapshots.flush)
+            self.writer.submit(self.journal.reset)
+            self.mark_checkpoint()
+            return
+        messages, history = self._journaled
+        self._journaled = len(self.message_log.messages), len(self.history)
+        self.writer.submit(self.journal.append, Entry(
+            self.turn_count,
+            save_schema.message_rows(self.message_log.messages[messages:]),
+            self.history[history:],
+            tuple(i._identified for i in self.game_map.item_factories),
+            self.game_map.floor_number,
+        ))
+
+    def recover(self) -> Engine:
+        """This game brought up to the last turn the journal and turn snapshots both hold."""
+        entries = list(self.journal.entries(after=self.turn_count))
+        # the two are written separately, so one may be a little behind
+        while entries and entries[-1].turn not in self.snapshots:
+            entries.pop()
+        self.journal.truncate(entries[-1].turn if entries else self.turn_count)
+        if not entries:
+            self.mark_checkpoint()
+            return self
+
+        data, layers = self.snapshots[entries[-1].turn]
+        engine = pickling.loads(data, self.run_objects)
+        assert isinstance(engine, Engine)
+        for name, layer in layers.items():
+            setattr(engine.game_map, name, layer)
+
+        log = self.message_log
+        for entry in entries:
+            log.messages += save_schema.messages_from_rows(entry.messages, len(entry.messages), log)
+            self.history += entry.history
+        for item, identified in zip(self.game_map.item_factories, entries[-1].identified):
+            item._identified = identified
+
+        engine.message_log = log
+        log.engine = engine
+        engine.history = self.history
+        for name in ("meta", "terminal", "console", "_snapshots", "_journal"):
+            setattr(engine, name, getattr(self, name))
+        engine.mark_checkpoint(self.turn_count)
+        return engine
+
+    def mark_checkpoint(self, turn: Optional[int] = None):
+        """Note that the game, now or at `turn`, is checkpointed."""
+        self._checkpoint_turn = self.turn_count if turn is None else turn
+        self._journaled = len(self.message_log.messages), len(self.history)
 
     def check_word_mode(self):
         if len(self.player.inventory.items) < 1:
@@ -147,17 +309,25 @@ class Engine:
         return word in open(utils.get_resource("words.txt")).read().splitlines()
 
     def handle_enemy_turns(self) -> None:
-        enemies = sorted(set(self.game_map.actors) - {self.player}, key=lambda x: x.id)
+        if self.profiler:
+            self.profiler.start_turn()
+
+        # enemies with nothing to do this turn sit it out
+        with self.profile("schedule"):
+            enemies = sorted(set(self.game_map.actors) - {self.player}, key=lambda x: x.id)
+            enemies = self.scheduler.schedule(enemies)
 
         if not self.word_mode:
-            for entity in enemies:
-                if not isinstance(entity.ai.intent[0],WaitAction):
-                    entity.ai.clear_intent()
+            with self.profile("clear intents"):
+                for entity in enemies:
+                    if not isinstance(entity.ai.intent[0],WaitAction):
+                        entity.ai.clear_intent()
 
         # enemy pre turns
-        for entity in enemies:
-            if entity.ai:
-                entity.pre_turn()
+        with self.profile("pre_turn"):
+            for entity in enemies:
+                if entity.ai:
+                    entity.pre_turn()
 
         # enemy turns
         for entity in enemies:
@@ -183,40 +353,72 @@ class Engine:
                     continue
 
                 # the rest do their thing
-                try: 
-                    entity.ai.perform()
-                except exceptions.Impossible:
-                    pass
+                with self.profile("ai.perform", entity.ai):
+                    try: 
+                        entity.ai.perform()
+                    except exceptions.Impossible:
+                        pass
 
                 if not self.player.is_alive:
                     return
 
         # enemy post-turns
-        for entity in enemies:
-            if entity.ai:
-                entity.on_turn()
+        with self.profile("on_turn"):
+            for entity in enemies:
+                if entity.ai:
+                    entity.on_turn()
 
         # player post-turn
-        self.player.on_turn()
+        with self.profile("player on_turn"):
+            self.player.on_turn()
         
         self.turn_count += 1
-        self.save_turn_snapshot()
+        with self.profile("save_turn_snapshot"):
+            self.save_turn_snapshot()
+
+        with self.profile("plan intents"):
+            self.plan_intents()
+
+    def plan_intents(self) -> None:
+        """Decide every enemy's next intent now rather than on first look."""
+        enemies = sorted(set(self.game_map.actors) - {self.player}, key=lambda x: x.id)
+        found = self.planner.find_targets(self, enemies) if self.planner else {}
+        for entity in enemies:
+            if entity in found:
+                entity.ai._found = found[entity]
+            entity.ai.plan()
+
+    @property
+    def timeline(self):
+        if self._timeline is None:
+            self._timeline = Timeline()
+        return self._timeline
 
     def animation_beat(self,t=0.12,render=True):
+        """Queue the console to be shown for `t` seconds once the turn is done."""
+        if self.headless:
+            return
         self.mouse_location = (0,0)
         if render:
             self.console.clear()
             self.render(self.console)
-        self.terminal.present(self.console,integer_scaling=True,clear_color=(10,10,10))
-        time.sleep(t)
+        self.timeline.add(self.console, t)
+
+    @property
+    def fov_cache(self):
+        if not self._fov_cache:
+            self._fov_cache = FovCache()
+        return self._fov_cache
+
+    @property
+    def distance_fields(self):
+        if not self._distance_fields:
+            self._distance_fields = DistanceFields()
+        return self._distance_fields
 
     @property
     def fov(self):
-        return compute_fov(
-            self.game_map.tiles["transparent"],
-            (self.player.x, self.player.y),
-            radius=self.fov_radius,
-        )
+        return self.game_map.fov_from(self.player.x, self.player.y, self.fov_radius)
 
     @property
     def fov_actors(self):
@@ -250,9 +452,11 @@ class Engine:
 
     def update_fov(self) -> None:
         """Recompute the visible area based on the players point of view."""
-        self.game_map.visible[:] = self.fov
-        # If a tile is "visible" it should be added to "explored".
-        self.game_map.explored |= self.game_map.visible
+        with self.profile("update_fov"):
+            self.game_map.visible[:] = self.fov
+            # If a tile is "visible" it should be added to "explored".
+            self.game_map.explored |= self.game_map.visible
+            self.combat.refresh_seen()
 
     @property
     def do_turn_count(self):
@@ -322,18 +526,50 @@ class Engine:
             render_functions.print_fov_actors(console,self.player,(0,41))
             pass
 
+        if self.profiler:
+            render_functions.render_profiler(console,(1,1),self.profiler)
+
+
+    @property
+    def run_objects(self) -> list:
+        """Objects made once per run that turn snapshots refer to rather than copy."""
+        items = self.game_map.item_factories
+        return [items, *items]
+
+    def dumps(self, shared=()) -> bytes:
+        """Pickle this Engine instance, leaving out session-only state and `shared`."""
+        transient = {name: getattr(self, name) for name in self.transient}
+        for name in transient:
+            setattr(self, name, None)
+        try:
+            return pickling.dumps(self, shared)
+        finally:
+            for name, value in transient.items():
+                setattr(self, name, value)
+
+    def close(self) -> None:
+        """Flush and let go of the files this game keeps open."""
+        self.writer.flush()
+        if self._snapshots is not None:
+            self._snapshots.close()
+        if self._journal is not None:
+            self._journal.close()
 
     def save_as(self, filename: str) -> None:
-        """Save this Engine instance as a compressed file."""
-        meta = self.meta
-        terminal = self.terminal
-        console = self.console
-        self.meta = None
-        self.terminal = None
-        self.console = None
-        save_data = lzma.compress(pickle.dumps(self))
-        with open(filename, "wb") as f:
-            f.write(save_data)
-        self.meta = meta
-        self.terminal = terminal
-        self.console = console
\ No newline at end of file
+        """Save this Engine instance as a compressed file in the background."""
+        self.writer.submit(
+            write_encoded, filename, save_schema.dump(self), "savegames", save_schema.summary_header(self)
+        )
+        self.writer.submit(self.snapshots.flush)
+        self.writer.submit(self.journal.reset)
+        self.mark_checkpoint()
+
+
+def write_checkpoint(filename: str, data: bytes, layers: dict, messages: list, history: list, run_objects: list) -> None:
+    """Save the game in a turn snapshot's `data` and `layers`, with its log and history."""
+    engine = pickling.loads(data, run_objects)
+    for name, layer in layers.items():
+        setattr(engine.game_map, name, layer)
+    engine.message_log.messages = messages
+    engine.history = history
+    write_encoded(filename, save_schema.dump(engine), "savegames", save_schema.summary_header(engine))
@@ -5,8 +5,6 @@ import math
 import random
 from typing import Optional, Tuple, Type, TypeVar, TYPE_CHECKING, Union, Set
 
-from tcod.map import compute_fov
-
 from basilisk.render_order import RenderOrder
 
 from basilisk import color as Color
@@ -362,12 +360,7 @@ class Actor(Entity):
                 if not self.gamemap.visible[entity.x,entity.y] or entity.move_speed < 1:
                     continue
 
-                fom = compute_fov(
-                    self.gamemap.tiles["transparent"],
-                    (entity.x,entity.y),
-                    radius=entity.move_speed,
-                    light_walls=False
-                )
+                fom = self.gamemap.fov_from(entity.x, entity.y, entity.move_speed, light_walls=False)
 
                 for x,row in enumerate(fom):
                     for y,cel in enumerate(row):
@@ -433,6 +426,7 @@ class Actor(Entity):
             return
         self.engine.message_log.add_message(f"You constrict the {self.name}!", Color.offwhite)
         self.ai = Constricted(self, self.ai, self.color)
+        self.engine.combat.refresh(self)
         char_num = int(self.char)- (1 + self.engine.player.TAIL) if not self.is_boss else int(self.char) - 1
         if char_num < 0:
             self.die()
@@ -461,6 +455,7 @@ class Actor(Entity):
 
     def die(self) -> None:
         self.ai = None
+        self.engine.combat.refresh(self)
         if self.engine.player is self:
             death_message = "You died!"
             death_message_color = Color.dark_red
@@ -488,6 +483,7 @@ class Actor(Entity):
         if self.name == "Decoy" or self.is_boss:
             return
         if self is not self.engine.player:
+            self.engine.scheduler.wake(self)
             new_c = int(self.char)-amount
             if new_c < 0:
                 self.die()
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+import numpy as np  # type: ignore
+from tcod.map import compute_fov
+
+if TYPE_CHECKING:
+    from basilisk.game_map import GameMap
+
+
+class FovCache:
+    """LRU cache of one GameMap's fields of view, safe to share between threads."""
+
+    def __init__(self, size: int = 128):
+        self.size = size
+        self.game_map = None
+        self.version = None
+        self.fovs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, game_map: GameMap, x: int, y: int, radius: int, light_walls: bool = True) -> np.ndarray:
+        key = (x, y, radius, light_walls)
+
+        with self.lock:
+            if game_map is not self.game_map or game_map.transparency_version != self.version:
+                self.game_map = game_map
+                self.version = game_map.transparency_version
+                self.fovs.clear()
+
+            fov = self.fovs.get(key)
+            if fov is not None:
+                self.fovs.move_to_end(key)
+                return fov
+
+        # computed outside the lock so planner threads can overlap
+        fov = compute_fov(game_map.tiles["transparent"], (x, y), radius=radius, light_walls=light_walls)
+        fov.flags.writeable = False
+
+        with self.lock:
+            self.fovs[key] = fov
+            if len(self.fovs) > self.size:
+                self.fovs.popitem(last=False)
+        return fov
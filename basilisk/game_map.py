@@ -4,7 +4,6 @@ from typing import Iterable, Iterator, Optional, TYPE_CHECKING
 
 import numpy as np  # type: ignore
 from tcod.console import Console
-from tcod.map import compute_fov
 import random
 
 from basilisk import color, tile_types
@@ -13,6 +12,7 @@ from basilisk.actions import ActionWithDirection
 from basilisk.render_functions import DIRECTIONS, D_ARROWS
 from basilisk.components.status_effect import ThirdEyeBlind, Petrified, PetrifEyes, PhasedOut
 from basilisk.components.ai import Statue
+from basilisk.packed_layer import PackedLayer
 
 if TYPE_CHECKING:
     from basilisk.engine import Engine
@@ -20,6 +20,13 @@ if TYPE_CHECKING:
 
 
 class GameMap:
+    # bumped whenever a tile's transparency changes, to invalidate cached fovs
+    transparency_version = 0
+    # bumped whenever any tile changes, to invalidate cached distance fields
+    tiles_version = 0
+    # numpy arrays that turn snapshots store apart from the rest of the map
+    layers = ("tiles", "visible", "explored", "mapped")
+
     def __init__(
         self, engine: Engine, width: int, height: int, floor_number: int, items: Iterable, entities: Iterable[Entity] = (), vowel = None, decoy = None, game_mode = 'default'
     ):
@@ -46,6 +53,20 @@ class GameMap:
         self._next_id = 1
         self.game_mode = game_mode
 
+    def __getstate__(self):
+        # the bool layers are pickled bit-packed; see PackedLayer
+        state = self.__dict__.copy()
+        for name in ("visible", "explored", "mapped"):
+            if isinstance(state[name], np.ndarray):
+                state[name] = PackedLayer.pack(state[name])
+        return state
+
+    def __setstate__(self, state):
+        for name in ("visible", "explored", "mapped"):
+            if isinstance(state.get(name), PackedLayer):
+                state[name] = state[name].unpack()
+        self.__dict__.update(state)
+
     @property
     def actors(self) -> Iterable[Actor]:
         """Iterate over this maps living actors."""
@@ -72,10 +93,20 @@ class GameMap:
     def boss(self):
         return [a for a in self.actors if a.is_boss][0]
 
+    def set_tile(self, x: int, y: int, tile: np.ndarray) -> None:
+        if self.tiles["transparent"][x,y] != tile["transparent"]:
+            self.transparency_version += 1
+        self.tiles_version += 1
+        self.tiles[x,y] = tile
+
     def bloody_floor(self,x,y):
         if self.tiles[x,y] == tile_types.floor:
-            self.tiles[x,y] = tile_types.bloody_floor
+            self.set_tile(x,y,tile_types.bloody_floor)
+
 
+    def fov_from(self, x: int, y: int, radius: int, light_walls: bool = True) -> np.ndarray:
+        """Read-only field of view from (x, y), shared through the engine's cache."""
+        return self.engine.fov_cache.get(self, x, y, radius, light_walls)
 
     def smellable(self,entity: Entity, super_smell:bool=False):
         dx = entity.x-self.engine.player.x
@@ -191,12 +222,7 @@ class GameMap:
         if not self.visible[entity.x,entity.y] and not self.smellable(entity, True):
             return
 
-        fom = compute_fov(
-            self.tiles["transparent"],
-            (entity.x,entity.y),
-            radius=entity.move_speed,
-            light_walls=False
-        )
+        fom = self.fov_from(entity.x, entity.y, entity.move_speed, light_walls=False)
 
         for x,row in enumerate(fom):
             for y,cel in enumerate(row):
@@ -211,12 +237,7 @@ class GameMap:
         ):
             return
 
-        fov = compute_fov(
-            self.tiles["transparent"],
-            (entity.x, entity.y),
-            radius=8,
-            light_walls=False
-        )
+        fov = self.fov_from(entity.x, entity.y, 8, light_walls=False)
 
         for x,row in enumerate(fov):
             for y,cel in enumerate(row):
@@ -326,6 +347,19 @@ class GameMap:
 
         self.print_item_tile(self.engine.player,self.engine.player.xy,console)
 
+    def snapshot_view(self) -> list:
+        """The visible entities and the snake as (x, y, char, color) records, in draw order."""
+        player = self.engine.player
+        snake = set(player.inventory.items)
+        view = [
+            (e.x, e.y, e.char, e.color)
+            for e in sorted(self.entities, key=lambda x: x.render_order.value)
+            if e is not player and e not in snake and self.visible[e.x,e.y]
+        ]
+        for i in list(reversed(player.inventory.items)) + [player]:
+            view.append((i.x, i.y, i.char, color.player))
+        return view
+
 
 class GameWorld:
     """
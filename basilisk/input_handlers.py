@@ -6,7 +6,6 @@ from typing import Callable, Optional, Tuple, TYPE_CHECKING, Union
 
 import tcod.event
 import math
-import glob
 
 from basilisk import actions, color, exceptions
 from basilisk.actions import (
@@ -343,6 +342,10 @@ class MainGameEventHandler(EventHandler):
         elif key == tcod.event.K_p:
             return CompendiumHandler(self.engine)
 
+        # debug overlay: per-phase turn timings
+        elif key == tcod.event.K_F3:
+            self.engine.toggle_profiler()
+
         # No valid key was pressed
         return action
 
@@ -543,11 +546,12 @@ class ConfirmCombatHandler(EventHandler):
 class GameOverEventHandler(EventHandler):
     def __init__(self,engine,loss=True):
         super().__init__(engine)
+        # a checkpoint may still be on its way to disk; let it land first
+        self.engine.writer.flush()
         if os.path.exists(utils.get_resource("savegame.sav")):
             os.remove(utils.get_resource("savegame.sav"))  # Deletes the active save file.
-        snapshots = glob.glob(utils.get_resource("snapshot_*.sav"))
-        for s in snapshots:
-            os.remove(s)
+        self.engine.snapshots.delete()
+        self.engine.journal.delete()
 
         event = 'lose' if loss else 'win'
         self.engine.history.append((event,self.engine.player.cause_of_death,self.engine.turn_count))
@@ -1135,11 +1139,7 @@ class CompendiumHandler(AskUserEventHandler):
         # then known unidentified items, excluding y, and excluding y's dup if y's identified
         index += len(identified_items)
         def known(item):
-            for r in self.engine.meta.old_runs:
-                for e in r:
-                    if e[1] == item.name:
-                        return True
-            return False
+            return self.engine.meta.runs.seen(item.name)
 
         def not_y(item):
             return item.char != 'y' and (item.name != y.name or not y._identified)
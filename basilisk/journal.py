@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import os
+import pickle
+import struct
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+
+class Entry(NamedTuple):
+    """What one turn added that its turn snapshot doesn't hold."""
+    turn: int
+    messages: List[tuple]  # rows of save_schema.MESSAGE_FIELDS
+    history: List[tuple]
+    identified: Tuple[bool, ...]  # each item factory's _identified
+    floor: Optional[int] = None
+
+
+class Journal:
+    """Append-only record of every turn since the last checkpoint save."""
+
+    LENGTH = struct.Struct("<I")
+    # kept in the resource directory beside savegame.sav
+    default_filename = "savegame.journal"
+
+    def __init__(self, filename: str, sync_every: int = 5):
+        self.filename = filename
+        self.sync_every = sync_every
+        self.file = None
+        self.unsynced = 0
+
+    def append(self, entry: Entry) -> None:
+        if self.file is None:
+            self.file = open(self.filename, "ab")
+        data = pickle.dumps(tuple(entry))
+        self.file.write(self.LENGTH.pack(len(data)) + data)
+        self.file.flush()
+        self.unsynced += 1
+        if self.unsynced >= self.sync_every:
+            self.sync()
+
+    def sync(self) -> None:
+        if self.file is not None and self.unsynced:
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+
+    def reset(self) -> None:
+        """Empty the journal, after a checkpoint."""
+        self.close()
+        with open(self.filename, "wb"):
+            pass
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+    def delete(self) -> None:
+        self.close()
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def entries(self, after: Optional[int] = None) -> Iterator[Entry]:
+        """Every whole entry in the journal, from turns after `after`."""
+        for entry, _ in self.scan():
+            if after is None or entry.turn > after:
+                yield entry
+
+    def truncate(self, turn: int) -> None:
+        """Drop the entries after `turn`, and any half-written one."""
+        end = 0
+        for entry, offset in self.scan():
+            if entry.turn > turn:
+                break
+            end = offset
+        self.close()
+        if os.path.exists(self.filename):
+            with open(self.filename, "r+b") as f:
+                f.truncate(end)
+
+    def scan(self) -> Iterator[Tuple[Entry, int]]:
+        """Each whole entry, with the offset just past it."""
+        if not os.path.exists(self.filename):
+            return
+        with open(self.filename, "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset + self.LENGTH.size <= len(data):
+            length, = self.LENGTH.unpack_from(data, offset)
+            start = offset + self.LENGTH.size
+            if start + length > len(data):
+                break
+            offset = start + length
+            yield Entry(*pickle.loads(data[start:offset])), offset
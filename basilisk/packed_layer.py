@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from typing import Dict, Tuple
+
+import numpy as np  # type: ignore
+
+
+class PackedLayer:
+    """A bool map layer packed eight cells to the byte, for storing and pickling."""
+
+    def __init__(self, bits: np.ndarray, shape: Tuple[int, int], order: str):
+        self.bits = bits
+        self.shape = shape
+        self.order = order
+
+    @classmethod
+    def pack(cls, layer: np.ndarray) -> PackedLayer:
+        order = "F" if layer.flags.f_contiguous else "C"
+        return cls(np.packbits(layer.ravel(order=order)), layer.shape, order)
+
+    def unpack(self) -> np.ndarray:
+        size = self.shape[0] * self.shape[1]
+        flat = np.unpackbits(self.bits, count=size).view(bool)
+        return flat.reshape(self.shape, order=self.order)
+
+    def __getitem__(self, xy: Tuple[int, int]) -> bool:
+        x, y = xy
+        i = x + y * self.shape[0] if self.order == "F" else x * self.shape[1] + y
+        return bool(self.bits[i >> 3] & (0x80 >> (i & 7)))
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, PackedLayer) and self.shape == other.shape
+            and self.order == other.order and np.array_equal(self.bits, other.bits)
+        )
+
+
+def pack_layers(layers: Dict[str, np.ndarray]) -> Dict[str, object]:
+    """`layers` with every bool layer packed."""
+    return {
+        name: PackedLayer.pack(layer) if layer.dtype == bool else layer
+        for name, layer in layers.items()
+    }
+
+
+def unpack_layers(layers: Dict[str, object]) -> Dict[str, np.ndarray]:
+    """Undo `pack_layers`, into fresh arrays that are safe to change."""
+    return {
+        name: layer.unpack() if isinstance(layer, PackedLayer) else layer.copy(order="K")
+        for name, layer in layers.items()
+    }
@@ -0,0 +1,106 @@
+"""Pickling that refers to prototypes and `shared` objects instead of copying them."""
+from __future__ import annotations
+
+import importlib
+import io
+import pickle
+import struct
+import types
+from typing import Dict, Optional, Sequence, Tuple
+
+
+STATIC_MODULES = ("basilisk.entity_factories", "basilisk.tile_types", "basilisk.color")
+
+# out-of-band pickles start with this, the number of buffers and their lengths
+MAGIC = b"BSOB"
+COUNT = struct.Struct("<I")
+LENGTH = struct.Struct("<Q")
+
+# buffers smaller than this aren't worth taking out of the stream
+MIN_OUT_OF_BAND = 1024
+
+_static: Optional[Dict[int, Tuple[str, str, str]]] = None
+
+
+def static_objects() -> Dict[int, Tuple[str, str, str]]:
+    """{id(obj): persistent id} for every object that's pickled by name."""
+    global _static
+    if _static is None:
+        _static = {}
+        for module_name in STATIC_MODULES:
+            module = importlib.import_module(module_name)
+            for name, value in vars(module).items():
+                # plain values, single colors included, cost less to copy than
+                # to refer to, and may be shared by identity with other data
+                if name.startswith("_") or callable(value) or isinstance(
+                    value, (types.ModuleType, bool, int, float, str, bytes, tuple, type(None))
+                ):
+                    continue
+                _static.setdefault(id(value), ("static", module_name, name))
+    return _static
+
+
+class Pickler(pickle.Pickler):
+    def __init__(self, file, shared: Sequence = (), buffer_callback=None):
+        super().__init__(file, 5, buffer_callback=buffer_callback)
+        # the same id object is handed back for every reference to an object,
+        # so the pickle memo stores it once
+        self.ids = dict(static_objects())
+        self.ids.update((id(obj), ("shared", i)) for i, obj in enumerate(shared))
+
+    def persistent_id(self, obj):
+        return self.ids.get(id(obj))
+
+
+class Unpickler(pickle.Unpickler):
+    def __init__(self, file, shared: Sequence = (), buffers=None):
+        super().__init__(file, buffers=buffers)
+        self.shared = shared
+
+    def persistent_load(self, pid):
+        if pid[0] == "shared":
+            return self.shared[pid[1]]
+        if pid[0] == "static" and pid[1] in STATIC_MODULES:
+            return getattr(importlib.import_module(pid[1]), pid[2])
+        raise pickle.UnpicklingError(f"Unknown persistent id {pid!r}")
+
+
+def dumps(obj, shared: Sequence = ()) -> bytes:
+    buffers = []
+
+    def out_of_band(buffer: pickle.PickleBuffer) -> bool:
+        if buffer.raw().nbytes < MIN_OUT_OF_BAND:
+            return True
+        buffers.append(buffer)
+        return False
+
+    f = io.BytesIO()
+    Pickler(f, shared, out_of_band).dump(obj)
+    if not buffers:
+        return f.getvalue()
+
+    raws = [buffer.raw() for buffer in buffers]
+    header = [MAGIC, COUNT.pack(len(raws))] + [LENGTH.pack(raw.nbytes) for raw in raws]
+    return b"".join(header + [f.getvalue()] + raws)
+
+
+def loads(data: bytes, shared: Sequence = ()):
+    if not data.startswith(MAGIC):
+        return Unpickler(io.BytesIO(data), shared).load()
+
+    view = memoryview(data)
+    offset = len(MAGIC)
+    count, = COUNT.unpack_from(view, offset)
+    offset += COUNT.size
+    lengths = [LENGTH.unpack_from(view, offset + i * LENGTH.size)[0] for i in range(count)]
+    offset += count * LENGTH.size
+
+    # the layers are changed in place, so they need writable memory; copy all
+    # the buffers in one go and hand out views over that
+    end = len(data) - sum(lengths)
+    block = memoryview(bytearray(view[end:]))
+    buffers = []
+    for length in lengths:
+        buffers.append(block[:length])
+        block = block[length:]
+    return Unpickler(io.BytesIO(view[offset:end]), shared, buffers).load()
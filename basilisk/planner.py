@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, TYPE_CHECKING
+
+from basilisk.components.ai import HostileEnemy
+
+if TYPE_CHECKING:
+    from basilisk.engine import Engine
+    from basilisk.entity import Actor
+
+
+class IntentPlanner:
+    """Runs find_target for undecided enemies on a thread pool ahead of plan_intents."""
+
+    def __init__(self, workers: int = 4, min_actors: int = 16):
+        self.workers = workers
+        self.min_actors = min_actors
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="planner")
+
+    def find_targets(self, engine: Engine, enemies: Iterable[Actor]) -> Dict[Actor, tuple]:
+        hostile = [e for e in enemies if type(e.ai) is HostileEnemy and not e.ai._intent]
+        if len(hostile) < self.min_actors:
+            return {}
+
+        # build the shared distance fields up front so workers only read them
+        gm = engine.game_map
+        decoys = [e.xy for e in gm.entities if e.name == "Decoy"]
+        if decoys:
+            engine.distance_fields.get(gm, decoys)
+        engine.distance_fields.get(gm, [engine.player.xy] + [i.xy for i in engine.player.inventory.items])
+
+        return dict(zip(hostile, self.pool.map(lambda e: e.ai.find_target(), hostile)))
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=True)
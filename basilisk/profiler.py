@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict
+
+
+class TurnProfiler:
+    """Opt-in rolling wall times for the phases of the enemy turn."""
+
+    phases = (
+        "schedule",
+        "clear intents",
+        "pre_turn",
+        "ai.perform",
+        "on_turn",
+        "player on_turn",
+        "save_turn_snapshot",
+        "plan intents",
+        "update_fov",
+    )
+
+    def __init__(self, window: int = 60):
+        self.window = window
+        self.turns = deque(maxlen=window)
+
+    def start_turn(self) -> None:
+        self.turns.append({"phases": {}, "ai": {}})
+
+    @contextmanager
+    def phase(self, name: str, ai=None):
+        """Time the body under `name`, and under the class of `ai` if given."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if not self.turns:
+                self.start_turn()
+            turn = self.turns[-1]
+            turn["phases"][name] = turn["phases"].get(name, 0) + elapsed
+            if ai is not None:
+                key = type(ai).__name__
+                turn["ai"][key] = turn["ai"].get(key, 0) + elapsed
+
+    def averages(self) -> Dict[str, Dict[str, float]]:
+        """Mean milliseconds per turn for each phase and AI class."""
+        n = len(self.turns)
+        phases: Dict[str, float] = {name: 0.0 for name in self.phases}
+        ais: Dict[str, float] = {}
+
+        for turn in self.turns:
+            for name, t in turn["phases"].items():
+                phases[name] = phases.get(name, 0.0) + t
+            for name, t in turn["ai"].items():
+                ais[name] = ais.get(name, 0.0) + t
+
+        if n:
+            phases = {k: v * 1000 / n for k, v in phases.items()}
+            ais = {k: v * 1000 / n for k, v in ais.items()}
+
+        return {"phases": phases, "ai": ais}
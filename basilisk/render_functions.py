@@ -5,7 +5,10 @@ from typing import Tuple, TYPE_CHECKING
 import random
 import math
 
-from basilisk import color
+import numpy as np  # type: ignore
+import tcod
+
+from basilisk import color, tile_types
 from basilisk.message_log import MessageLog
 from basilisk.render_order import RenderOrder
 from basilisk.tile_types import NAMES, FLAVORS
@@ -298,3 +301,37 @@ def print_fov_actors(console,player,xy):
 
     console.print(6,49,"(c)ontrols",color.dark_grey)
 
+
+
+def render_profiler(console: Console, location: Tuple[int,int], profiler) -> None:
+    x, y = location
+    averages = profiler.averages()
+    rows = list(averages["phases"].items()) + [(None,None)] + sorted(averages["ai"].items(), key=lambda i: -i[1])
+    width = 30
+
+    console.draw_frame(x,y,width,len(rows)+3,fg=color.grey,bg=color.black)
+    console.print(x+2,y,f"┤ms/turn ({len(profiler.turns)})├",fg=color.grey,bg=color.black)
+
+    total = sum(averages["phases"].values())
+    console.print(x+2,y+1,"total",fg=color.offwhite)
+    console.print_box(x+1,y+1,width-3,1,f"{total:.2f}",fg=color.offwhite,alignment=tcod.RIGHT)
+
+    for i,(name,ms) in enumerate(rows):
+        if name is None:
+            continue
+        fg = color.offwhite if ms >= total/4 else color.grey
+        console.print(x+2,y+2+i,name,fg=fg)
+        console.print_box(x+1,y+2+i,width-3,1,f"{ms:.2f}",fg=fg,alignment=tcod.RIGHT)
+
+
+def render_snapshot_view(console: Console, layers, view) -> None:
+    """Draw the map as a turn snapshot saw it, from its layers and entity records alone."""
+    tiles = layers["tiles"]
+    width, height = tiles.shape
+    console.tiles_rgb[0:width, 0:height] = np.select(
+        condlist=[layers["visible"], layers["explored"], layers["mapped"]],
+        choicelist=[tiles["light"], tiles["dark"], tile_types.MAPPED],
+        default=tile_types.SHROUD,
+    )
+    for x, y, char, fg in view:
+        console.print(x, y, char, fg=fg)
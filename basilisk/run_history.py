@@ -0,0 +1,146 @@
+"""Every finished run's history, in a local SQLite database."""
+from __future__ import annotations
+
+import math
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    difficulty TEXT NOT NULL,
+    outcome TEXT,
+    cause,
+    turns INTEGER
+);
+CREATE TABLE IF NOT EXISTS events (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    seq INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    arg,
+    turn INTEGER,
+    PRIMARY KEY (run_id, seq)
+);
+CREATE INDEX IF NOT EXISTS runs_difficulty ON runs(difficulty, outcome);
+CREATE INDEX IF NOT EXISTS events_kind ON events(kind, run_id, arg);
+CREATE INDEX IF NOT EXISTS events_arg ON events(arg);
+"""
+
+
+class RunHistory:
+    def __init__(self, filename: str):
+        self.db = sqlite3.connect(filename)
+        self.db.executescript(SCHEMA)
+        # counted once and kept up to date, since the main menu asks every frame
+        self.count = self.db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def log(self, history: List[tuple]) -> None:
+        """Add one finished run, in one transaction."""
+        with self.db:
+            self.insert(history)
+        self.count += 1
+
+    def import_runs(self, runs: Iterable[List[tuple]]) -> None:
+        """Add runs from the old settings file, unless they already are."""
+        with self.db:
+            if self.db.execute("SELECT EXISTS(SELECT 1 FROM runs)").fetchone()[0]:
+                return
+            for history in runs:
+                self.insert(history)
+                self.count += 1
+
+    def insert(self, history: List[tuple]) -> None:
+        start, end = history[0], history[-1]
+        difficulty = start[1] if start[0] == "start" else "easy"
+        run_id = self.db.execute(
+            "INSERT INTO runs (difficulty, outcome, cause, turns) VALUES (?, ?, ?, ?)",
+            (difficulty, end[0], end[1], end[2])
+        ).lastrowid
+        self.db.executemany(
+            "INSERT INTO events (run_id, seq, kind, arg, turn) VALUES (?, ?, ?, ?, ?)",
+            ((run_id, seq, kind, arg, turn) for seq, (kind, arg, turn) in enumerate(history))
+        )
+
+    def seen(self, arg) -> bool:
+        """Whether any event of any run was about `arg`."""
+        return self.db.execute("SELECT EXISTS(SELECT 1 FROM events WHERE arg = ?)", (arg,)).fetchone()[0]
+
+    def value(self, sql: str, *params):
+        """The first column of the first row `sql` finds, or None if it finds none."""
+        row = self.db.execute(sql, params).fetchone()
+        return row[0] if row else None
+
+    def stats(self, difficulty: str) -> Optional[Dict[str, Dict]]:
+        """The history screen's numbers for runs on `difficulty` (or "all"), or None if none."""
+        scope, params = ("", ()) if difficulty == "all" else ("AND r.difficulty = ?", (difficulty,))
+        runs = f"SELECT r.id FROM runs r WHERE 1 {scope}"
+        last = self.db.execute(
+            f"SELECT id, outcome, cause, turns FROM runs r WHERE 1 {scope} ORDER BY id DESC LIMIT 1", params
+        ).fetchone()
+        if last is None:
+            return None
+        run_id, outcome, cause, turns = last
+
+        def run_value(sql: str, *args):
+            return self.value(sql, run_id, *args)
+
+        def scope_value(sql: str, *args):
+            return self.value(sql.format(runs=runs), *args, *params)
+
+        distinct = "SELECT COUNT(DISTINCT arg) FROM events WHERE run_id = ? AND kind = ?"
+        longest = "SELECT arg FROM events WHERE run_id = ? AND kind = 'form word' ORDER BY length(arg) DESC, seq LIMIT 1"
+        last_run = {
+            "name": run_value(
+                "SELECT arg FROM events WHERE run_id = ? AND kind = 'form word' ORDER BY seq DESC LIMIT 1"
+            ) or "",
+            "won": outcome == "win",
+            "level": run_value("SELECT COUNT(*) FROM events WHERE run_id = ? AND kind = 'descend stairs'") + 1,
+            "turns": turns,
+            "unique kills": run_value(distinct, "kill enemy"),
+            "items identified": run_value(distinct, "identify item"),
+            "longest word": run_value(longest) or "n/a",
+            "unique words": run_value(distinct, "form word"),
+            "killed by": cause,
+        }
+
+        distinct = "SELECT COUNT(DISTINCT arg) FROM events WHERE kind = ? AND run_id IN ({runs})"
+        longest = "SELECT arg FROM events WHERE kind = 'form word' AND run_id IN ({runs}) ORDER BY length(arg) DESC LIMIT 1"
+        all_time = {
+            "turns": scope_value("SELECT SUM(turns) FROM runs WHERE id IN ({runs})"),
+            "unique kills": scope_value(distinct, "kill enemy"),
+            "items identified": scope_value(distinct, "identify item"),
+            "longest word": scope_value(longest) or "",
+            "unique words": scope_value(distinct, "form word"),
+            "nemesis": scope_value(
+                "SELECT cause FROM runs WHERE outcome = 'lose' AND id IN ({runs}) "
+                "GROUP BY cause ORDER BY COUNT(*) DESC LIMIT 1"
+            ) or "",
+        }
+
+        endings: Dict[str, int] = dict(self.db.execute(
+            f"SELECT kind, COUNT(*) FROM events WHERE kind IN ('win', 'lose') AND run_id IN ({runs}) GROUP BY kind",
+            params
+        ).fetchall())
+        wins: List[Tuple[int, Optional[str]]] = self.db.execute(
+            "SELECT turns, (SELECT arg FROM events WHERE run_id = r.id AND kind = 'form word' ORDER BY seq DESC LIMIT 1) "
+            f"FROM runs r WHERE outcome = 'win' {scope} ORDER BY id", params
+        ).fetchall()
+        records = {
+            "lowest floor": scope_value(
+                "SELECT MAX(arg) FROM events WHERE kind = 'descend stairs' AND run_id IN ({runs})"
+            ) or 1,
+            "wins": len(wins),
+            "win %": math.floor(endings.get("win", 0) / sum(endings.values()) * 10000) / 100,
+            "fastest win": min(t for t, _ in wins) if wins else "n/a",
+        }
+
+        return {
+            "last run": last_run,
+            "all time": all_time,
+            "records": records,
+            "winning words": [word for _, word in wins],
+        }
@@ -0,0 +1,226 @@
+"""The savegame format: versioned flat records, upgraded by MIGRATIONS on load."""
+from __future__ import annotations
+
+import copy
+import importlib
+import pickle
+import struct
+from collections import deque
+from itertools import repeat
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+from basilisk import codec, pickling
+from basilisk.entity import Entity
+from basilisk.journal import Entry, Journal
+from basilisk.message_log import Message
+from basilisk.packed_layer import pack_layers, unpack_layers
+
+if TYPE_CHECKING:
+    from basilisk.engine import Engine
+
+
+VERSION = 2
+
+
+def history_beside_records(save: dict) -> dict:
+    save["history"] = save["records"].pop("history")
+    return save
+
+
+MIGRATIONS: Dict[int, Callable[[dict], dict]] = {
+    1: history_beside_records,
+}
+
+SUMMARY_MAGIC = b"BSSM"
+SUMMARY_LENGTH = struct.Struct("<I")
+
+MESSAGE_FIELDS = ("text", "plain_text", "fg", "count", "turn_count", "arg", "arg_color")
+
+# fields held in records of their own rather than with their object
+ENGINE_SPLIT = ("message_log", "history")
+MAP_SPLIT = ("tiles", "visible", "explored", "mapped")
+LOG_SPLIT = ("messages",)
+
+
+def class_key(obj) -> str:
+    return f"{type(obj).__module__}:{type(obj).__qualname__}"
+
+
+def find_class(key: str) -> type:
+    module, name = key.split(":")
+    if not module.startswith("basilisk."):
+        raise ValueError(f"Unexpected class {key} in save")
+    return getattr(importlib.import_module(module), name)
+
+
+def prototypes() -> Dict[Tuple[type, str], str]:
+    """{(class, name): attribute} for the entity prototypes in entity_factories."""
+    from basilisk import entity_factories
+    found = {}
+    for key, value in vars(entity_factories).items():
+        if isinstance(value, Entity):
+            found.setdefault((type(value), value.name), key)
+    return found
+
+
+def fields(obj, split=()) -> dict:
+    return {k: v for k, v in vars(obj).items() if k not in split}
+
+
+def dump(engine: Engine) -> bytes:
+    gm = engine.game_map
+    log = engine.message_log
+    protos = prototypes()
+
+    # the player and snake are on the map too; item factories aren't
+    entities: List[Entity] = sorted(gm.entities, key=lambda e: e.id)
+    entities += [i for i in gm.item_factories if i not in gm.entities]
+    objects = [engine, gm, engine.game_world, log] + entities
+
+    transient = {name: getattr(engine, name) for name in engine.transient}
+    for name in transient:
+        setattr(engine, name, None)
+    try:
+        records = {
+            "engine": fields(engine, ENGINE_SPLIT),
+            "map": fields(gm, MAP_SPLIT),
+            "world": fields(engine.game_world),
+            "log": fields(log, LOG_SPLIT),
+            "entities": [fields(e) for e in entities],
+            "layers": pack_layers({name: getattr(gm, name) for name in MAP_SPLIT}),
+            "messages": {f: [getattr(m, f, None) for m in log.messages] for f in MESSAGE_FIELDS},
+        }
+        state = pickling.dumps(records, objects)
+    finally:
+        for name, value in transient.items():
+            setattr(engine, name, value)
+
+    return pickling.dumps({
+        "version": VERSION,
+        "objects": [(class_key(o), protos.get((type(o), getattr(o, "name", None)))) for o in objects],
+        "state": state,
+        "history": engine.history,
+    })
+
+
+def load(data: bytes) -> Engine:
+    save = pickling.loads(data)
+    if not isinstance(save, dict):
+        # a whole pickled Engine, from before this format
+        return save
+
+    version = save["version"]
+    if version > VERSION:
+        raise ValueError(f"Save is from a newer version ({version})")
+
+    objects = [new_object(cls) for cls, _ in save["objects"]]
+    save["records"] = pickling.loads(save.pop("state"), objects)
+    while version < VERSION:
+        save = MIGRATIONS[version](save)
+        version += 1
+    records = save["records"]
+
+    engine, gm, world, log = objects[:4]
+    vars(engine).update(records["engine"])
+    vars(gm).update(records["map"])
+    vars(world).update(records["world"])
+    vars(log).update(records["log"])
+    from basilisk import entity_factories
+    for entity, record, (_, proto) in zip(objects[4:], records["entities"], save["objects"][4:]):
+        vars(entity).update(record)
+        prototype = getattr(entity_factories, proto, None) if proto else None
+        if prototype is not None:
+            for name in vars(prototype).keys() - record.keys():
+                vars(entity)[name] = copy.deepcopy(vars(prototype)[name])
+    vars(gm).update(unpack_layers(records["layers"]))
+
+    columns = records["messages"]
+    count = len(columns["text"])
+    log.messages = messages_from_rows(zip(*[columns.get(f) or [None] * count for f in MESSAGE_FIELDS]), count, log)
+
+    engine.message_log = log
+    engine.history = save["history"]
+    return engine
+
+
+def message_rows(messages: List[Message]) -> List[tuple]:
+    """`messages` as rows of MESSAGE_FIELDS."""
+    return [tuple(getattr(m, f, None) for f in MESSAGE_FIELDS) for m in messages]
+
+
+def messages_from_rows(rows: Iterable[tuple], count: int, log) -> List[Message]:
+    """The `count` messages in `rows` of MESSAGE_FIELDS, belonging to `log`."""
+    # messages are the bulk of a save; rebuild them with maps rather than a
+    # loop so the work stays out of the interpreter
+    messages = list(map(Message.__new__, repeat(Message, count)))
+    rows = map(tuple.__add__, rows, repeat((log,)))
+    states = map(dict, map(zip, repeat(MESSAGE_FIELDS + ("parent",)), rows))
+    deque(map(setattr, messages, repeat("__dict__"), states), maxlen=0)
+    return messages
+
+
+def journaled(journal: Optional[Journal], turn: int) -> List[Entry]:
+    """The entries in `journal`, if any, for turns played after `turn`."""
+    return list(journal.entries(after=turn)) if journal is not None else []
+
+
+def load_run(data: bytes, journal: Optional[Journal] = None) -> Tuple[list, int]:
+    """The run history and turn count in a save's `data` and `journal`."""
+    head, body = split_summary(data)
+    body = codec.decode(body)
+    save = pickling.loads(body)
+    if head is not None and isinstance(save, dict) and "history" in save:
+        history, turn = save["history"], head["turn"]
+    else:
+        engine = load(body)
+        history, turn = engine.history, engine.turn_count
+    for entry in journaled(journal, turn):
+        history += entry.history
+        turn = entry.turn
+    return history, turn
+
+
+def summary(engine: Engine) -> dict:
+    """What the main menu shows of a saved game."""
+    return {
+        "floor": engine.game_map.floor_number,
+        "turn": engine.turn_count,
+        "words": [i[1] for i in engine.history if i[0] == 'form word'],
+    }
+
+
+def summary_header(engine: Engine) -> bytes:
+    data = pickle.dumps(summary(engine))
+    return SUMMARY_MAGIC + SUMMARY_LENGTH.pack(len(data)) + data
+
+
+def split_summary(data: bytes) -> Tuple[Optional[dict], bytes]:
+    """A save file's `data` as its summary, if it has one, and the save itself."""
+    if not data.startswith(SUMMARY_MAGIC):
+        return None, data
+    length, = SUMMARY_LENGTH.unpack_from(data, len(SUMMARY_MAGIC))
+    start = len(SUMMARY_MAGIC) + SUMMARY_LENGTH.size
+    return pickle.loads(data[start:start+length]), data[start+length:]
+
+
+def read_summary(filename: str, journal: Optional[Journal] = None) -> dict:
+    """A save file's summary, from its header and `journal`."""
+    with open(filename, "rb") as f:
+        head = f.read(len(SUMMARY_MAGIC) + SUMMARY_LENGTH.size)
+        if head.startswith(SUMMARY_MAGIC):
+            length, = SUMMARY_LENGTH.unpack_from(head, len(SUMMARY_MAGIC))
+            found = pickle.loads(f.read(length))
+        else:
+            found = summary(load(codec.decode(head + f.read())))
+    for entry in journaled(journal, found["turn"]):
+        found["turn"] = entry.turn
+        if entry.floor is not None:
+            found["floor"] = entry.floor
+        found["words"] += [i[1] for i in entry.history if i[0] == 'form word']
+    return found
+
+
+def new_object(key: str):
+    """An empty object of class `key`, to fill in from its record."""
+    cls = find_class(key)
+    return cls.__new__(cls)
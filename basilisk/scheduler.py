@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from typing import Iterable, List, Set, Tuple, TYPE_CHECKING
+
+from basilisk.actions import WaitAction
+from basilisk.components.ai import HostileEnemy, Statue
+
+if TYPE_CHECKING:
+    from basilisk.engine import Engine
+    from basilisk.entity import Actor
+
+
+class EnemyScheduler:
+    """Decides which enemies take part in a turn, parking those that would do nothing."""
+
+    # HostileEnemy fov radius
+    perception_radius = 8
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.woken: Set[Actor] = set()
+
+    def wake(self, actor: Actor) -> None:
+        if actor is not self.engine.player:
+            self.woken.add(actor)
+
+    def schedule(self, enemies: Iterable[Actor]) -> List[Actor]:
+        """Return the enemies that need a turn, in the order given."""
+        targets = self.targets()
+        active = [e for e in enemies if not self.is_dormant(e, targets)]
+        self.woken.clear()
+        return active
+
+    def targets(self) -> List[Tuple[int, int]]:
+        """Everything a HostileEnemy might notice: the snake and any decoys."""
+        player = self.engine.player
+        return (
+            [player.xy] +
+            [i.xy for i in player.inventory.items] +
+            [e.xy for e in self.engine.game_map.entities if e.name == "Decoy"]
+        )
+
+    def is_dormant(self, actor: Actor, targets: List[Tuple[int, int]]) -> bool:
+        ai = actor.ai
+        if (
+            actor in self.woken or
+            actor.statuses or
+            not ai._intent or
+            not all(isinstance(i,WaitAction) for i in ai._intent)
+        ):
+            return False
+
+        if isinstance(ai, Statue):
+            return True
+
+        if type(ai) is not HostileEnemy or ai.last_target:
+            return False
+
+        r = self.perception_radius
+        return not any(abs(x-actor.x) <= r and abs(y-actor.y) <= r for x,y in targets)
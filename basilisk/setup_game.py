@@ -1,10 +1,10 @@
 """Handle the loading and initialization of game sessions."""
 from __future__ import annotations
 
-import math
 import copy
-import lzma
+import os
 import pickle
+import time
 import traceback
 from typing import Optional
 
@@ -12,8 +12,11 @@ import tcod
 import random
 
 from basilisk.engine import Engine
-from basilisk import color, entity_factories, exceptions, input_handlers
+from basilisk import codec, color, entity_factories, exceptions, input_handlers, save_schema
 from basilisk.game_map import GameWorld
+from basilisk.journal import Journal
+from basilisk.run_history import RunHistory
+from basilisk.writer import get_writer, write_encoded
 from basilisk.components.status_effect import Phasing,Shielded,PetrifEyes,FreeSpit
 from basilisk.main_menu_animations import animations as mmas, default_animation, intro_animation
 
@@ -26,18 +29,16 @@ background_image = tcod.image.load(utils.get_resource("menu_background.png"))[:,
 def new_game(meta,terminal,console) -> Engine:
     """Return a brand new game session as an Engine instance."""
 
-    # If there's an existing save, log it as a game over
+    # If there's an existing save, log it as a game over; only its history is needed
     try:
-        engine = load_game(utils.get_resource("savegame.sav"))
+        with open(utils.get_resource("savegame.sav"), "rb") as f:
+            history, turn_count = save_schema.load_run(f.read(), saved_journal())
     except FileNotFoundError:
-        engine = None
+        history = None
 
-    if engine:
-        # make sure there's meta continuity when logging the run
-        engine.meta = meta
-        engine.history.append(("lose","scumming",engine.turn_count))
-        engine.log_run()
-        meta = engine.meta
+    if history is not None:
+        history.append(("lose","scumming",turn_count))
+        meta.log_run(history)
 
     map_width = 76
     map_height = 40
@@ -76,13 +77,32 @@ def new_game(meta,terminal,console) -> Engine:
 def load_game(filename: str) -> Engine:
     """Load an Engine instance from a file."""
     with open(filename, "rb") as f:
-        engine = pickle.loads(lzma.decompress(f.read()))
+        _, data = save_schema.split_summary(f.read())
+        engine = save_schema.load(codec.decode(data))
     assert isinstance(engine, Engine)
+    # turns played since the save, if the game wasn't shut down properly
+    engine.snapshots.load(os.path.dirname(filename))
+    engine = engine.recover()
+    engine.snapshots.truncate(engine.turn_count)
     return engine
 
+def saved_journal() -> Journal:
+    """The journal of turns played since the save was last written."""
+    return Journal(utils.get_resource(Journal.default_filename))
+
+def save_settings_if_due() -> None:
+    """Write out the settings if they've changed and it's been long enough."""
+    if Meta.current is not None:
+        Meta.current.save_if_due()
+
+def flush_settings() -> None:
+    """Write out any settings changes not yet on disk, and wait until they are."""
+    if Meta.current is not None:
+        Meta.current.flush()
+
 def load_settings(filename: str) -> Meta:
     with open(filename, "rb") as f:
-        meta = pickle.loads(lzma.decompress(f.read()))
+        meta = pickle.loads(codec.decode(f.read()))
     assert isinstance(meta, Meta)
     return meta
 
@@ -93,21 +113,19 @@ class MainMenu(input_handlers.BaseEventHandler):
         self.terminal = terminal
         self.console = console
 
+        # only the save's summary is read here; the game itself is loaded on (c)ontinue
         try:
-            self.engine = load_game(utils.get_resource("savegame.sav"))
-            self.engine.terminal = terminal
-            self.engine.console = console
+            self.save = save_schema.read_summary(utils.get_resource("savegame.sav"), saved_journal())
         except FileNotFoundError:
-            self.engine = None
+            self.save = None
 
+        # the last game's settings may not be on disk yet
+        flush_settings()
         try:
             self.meta = Meta(load_settings(utils.get_resource("savemeta.sav")))
         except FileNotFoundError:
             self.meta = Meta()
 
-        if self.engine:
-            self.engine.meta = self.meta
-
         self.frames = 0
         self.kf_length = 8
         self.kfs = 0
@@ -123,10 +141,10 @@ class MainMenu(input_handlers.BaseEventHandler):
         for i, text in enumerate(
             ["(c)ontinue", "(n)ew game", "(h)istory", "(o)ptions", "(q)uit"]
         ):
-            if i == 0 and not self.engine:
+            if i == 0 and not self.save:
                 y -= 2
                 continue
-            if i == 2 and not len(self.meta.old_runs):
+            if i == 2 and not len(self.meta.runs):
                 continue
             console.print(
                 68,
@@ -138,11 +156,8 @@ class MainMenu(input_handlers.BaseEventHandler):
                 bg_blend=tcod.BKGND_ALPHA(64),
             )
 
-        if self.engine:
-            history = self.engine.history
-            words = [i[1] for i in history if i[0] == 'form word']
-            uses = [i for i in history if i[0] in ['spit item','digest item']]
-            kills = [i for i in history if i[0] == 'kill enemy']
+        if self.save:
+            words = self.save["words"]
             pname = words[-1] if words else ''
 
             x = 22
@@ -157,8 +172,8 @@ class MainMenu(input_handlers.BaseEventHandler):
             console.print(x,y,pname,color.player)
             console.print(x+len(pname),y," the Basilisk",color.offwhite)
 
-            console.print(x,y+2,f"Floor: D{self.engine.game_map.floor_number}",color.offwhite)
-            console.print(x,y+3,f"Turn:  {self.engine.turn_count}",color.offwhite)
+            console.print(x,y+2,f"Floor: D{self.save['floor']}",color.offwhite)
+            console.print(x,y+3,f"Turn:  {self.save['turn']}",color.offwhite)
 
             lword = sorted(words,key=lambda x:len(x))[-1] if words else "n/a"
             console.print(x,y+5,f"History:",color.offwhite)
@@ -203,21 +218,28 @@ class MainMenu(input_handlers.BaseEventHandler):
         if event.sym in (tcod.event.K_q, tcod.event.K_ESCAPE):
             raise SystemExit()
         elif event.sym == tcod.event.K_c:
-            if self.engine:
-                return input_handlers.MainGameEventHandler(self.engine)
+            if self.save:
+                return input_handlers.MainGameEventHandler(self.continue_game())
             else:
                 return input_handlers.PopupMessage(self, "No saved game to load.")
         elif event.sym == tcod.event.K_n:
-            if self.engine:
+            if self.save:
                 return input_handlers.Confirm(parent=self,callback=self.start_new_game,prompt="Start a new game? Your existing save will be overwritten and marked as a loss.")
             else: return self.start_new_game()
-        elif event.sym == tcod.event.K_h and len(self.meta.old_runs):
+        elif event.sym == tcod.event.K_h and len(self.meta.runs):
             return HistoryMenu(self)
         elif event.sym == tcod.event.K_o:
             return OptionsMenu(self, self.meta)
 
         return None
 
+    def continue_game(self) -> Engine:
+        engine = load_game(utils.get_resource("savegame.sav"))
+        engine.terminal = self.terminal
+        engine.console = self.console
+        engine.meta = self.meta
+        return engine
+
     def start_new_game(self):
         return input_handlers.MainGameEventHandler(new_game(self.meta,self.terminal,self.console))
 
@@ -242,70 +264,27 @@ class HistoryMenu(SubMenu):
         self.calculate_stats()
 
     def calculate_stats(self):
-        # get history of the relevant difficulty; put old data in "easy"
+        # old runs, from before difficulties, count as "easy"
         difficulty = self.difficulties[self.difficulty_index].lower()
-        history = [run for run in self.parent.meta.old_runs if 
-            run[0][1] == difficulty or
-            difficulty == "all" or
-            (difficulty == "easy" and run[0][0] != "start")
-        ]
+        found = self.parent.meta.runs.stats(difficulty)
 
-        if not len(history):
+        if not found:
             self.stats = None
             return
 
-        shistory = [event for run in history for event in run]
-        last_run = history[-1]
-
         stats = {}
 
         # LAST RUN STATS
-        last_run = history[-1]
-        words = [i for i in last_run if i[0] == "form word"]
-
-        stats['Last run'] = [
-            ('name', words[-1][1] if len(words) else ""),
-            ('won', last_run[-1][0] == "win"),
-            ('level', len([i for i in last_run if i[0] == "descend stairs"])+1),
-            ('turns', last_run[-1][2]),
-            ('unique kills', len(set([i[1] for i in last_run if i[0] == "kill enemy"]))),
-            ('items identified', len(set([i[1] for i in last_run if i[0] == "identify item"]))),
-            ('longest word', max([i[1] for i in words], key=len) if len(words) > 0 else "n/a"),
-            ('unique words', len(set([i[1] for i in words]))),
-            ('killed by', last_run[-1][1])
-        ]
+        stats['Last run'] = list(found["last run"].items())
 
         # ALL TIME STATS
-        unique_words = set([event[1] for event in shistory if event[0] == "form word"])
-        killed_bys = [i[-1][1] for i in history if i[-1][0] == "lose"]
-
-        stats['All time'] = [
-            ('turns', sum([i[-1][2] for i in history])),
-            ('unique kills', len(set([event[1] for event in shistory if event[0] == "kill enemy"]))), 
-            ('items identified', len(set([event[1] for event in shistory if event[0] == "identify item"]))),
-            ('longest word', max(unique_words, key=len) if len(unique_words) > 0 else ""),
-            ('unique words', len(unique_words)),
-            ('nemesis', max(set(killed_bys),key=killed_bys.count) if len(killed_bys) > 0 else "")
-        ]
+        stats['All time'] = list(found["all time"].items())
 
         # RECORDS
-        floors = set([event[1] for event in shistory if event[0] == "descend stairs"])
-        highest_floor = max(floors) if len(floors) > 0 else 1
-        wins = [i for i in history if i[-1][0] == "win"]
-
-        stats['Records'] = [
-            ('lowest floor', max(floors) if len(floors) > 0 else 1),
-            ('wins', len(wins)),
-            ('win %', math.floor((len([i for i in shistory if i[0] == "win"])/len([i for i in shistory if i[0] in ["win","lose"]]))*10000)/100),
-            ('fastest win', min([i[-1][2] for i in wins]) if wins else "n/a")
-        ]
+        stats['Records'] = list(found["records"].items())
 
         # WINNING WORDS
-        last_words = []
-        for w in wins:
-            last_words.append([i[1] for i in w if i[0] == "form word"][-1])
-
-        stats['Winning words'] = last_words
+        stats['Winning words'] = found["winning words"]
 
         self.stats = stats
 
@@ -436,13 +415,20 @@ class OptionsMenu(SubMenu):
 
 
 class Meta():
+    # settings changes are written at most this often (seconds), and on flush
+    save_interval = 10.0
+    _dirty = False
+    _saved_at = float("-inf")
+    _runs: Optional[RunHistory] = None
+    # the settings in use, which exit paths flush whatever screen they're on
+    current: Optional[Meta] = None
+
     def __init__(self, old_meta=None):
         self._fullscreen = True
         self._do_combat_confirm = True
         self._tutorials = True
         self._difficulty = "easy"
         self._c_controls = True
-        self.old_runs = []
         self.tutorial_events = []
 
         def override(name):
@@ -453,7 +439,10 @@ class Meta():
             for i in ['_fullscreen','_do_combat_confirm','_tutorials','_difficulty','old_runs','tutorial_events','_c_controls']:
                 override(i)
 
-        self.save()
+        # settings loaded from disk are already there
+        self._dirty = old_meta is None
+        self._saved_at = time.monotonic()
+        Meta.current = self
 
     @property
     def do_combat_confirm(self):
@@ -504,11 +493,43 @@ class Meta():
         self.tutorial_events.append(event)
         self.save()
 
+    @property
+    def runs(self) -> RunHistory:
+        """Every finished run, including any from settings saved before the database."""
+        if self._runs is None:
+            self._runs = RunHistory(utils.get_resource("history.db"))
+            if "old_runs" in vars(self):
+                self._runs.import_runs(vars(self).pop("old_runs"))
+                self.save()
+        return self._runs
+
     def log_run(self, history):
-        self.old_runs.append(history)
-        self.save()
+        self.runs.log(history)
 
     def save(self):
-        save_data = lzma.compress(pickle.dumps(self))
-        with open(utils.get_resource("savemeta.sav"), "wb") as f:
-            f.write(save_data)
+        """Note that the settings have changed, to be written by `save_if_due` or `flush`."""
+        self._dirty = True
+        self.save_if_due()
+
+    def save_if_due(self):
+        if self._dirty and time.monotonic() - self._saved_at >= self.save_interval:
+            self.write()
+
+    def write(self):
+        # pickled now, compressed and written in the background
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        get_writer().submit(write_encoded, utils.get_resource("savemeta.sav"), pickle.dumps(self), "meta")
+
+    def flush(self):
+        """Write out any unsaved changes, and wait until they're on disk."""
+        if self._dirty:
+            self.write()
+        get_writer().flush()
+
+    def __getstate__(self):
+        state = vars(self).copy()
+        state.pop("_dirty", None)
+        state.pop("_saved_at", None)
+        state.pop("_runs", None)
+        return state
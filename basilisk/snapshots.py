@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import glob
+import mmap
+import os
+import struct
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np  # type: ignore
+
+from basilisk import codec, pickling
+from basilisk.packed_layer import pack_layers, unpack_layers
+
+
+Layers = Dict[str, np.ndarray]
+
+# a stored frame: the length of its encoded engine data, then that data,
+# then its encoded view and layers
+RECORD = struct.Struct("<I")
+
+
+class Frame:
+    """One turn in a SnapshotRing: the engine pickled without its map layers, and those layers."""
+
+    view: List[Tuple[int, int, str, Tuple[int, int, int]]] = []
+
+    def __init__(self, data: bytes, view=None):
+        self.data = data
+        if view is not None:
+            self.view = view
+        self.keyframe: Optional[Layers] = None
+        self.delta: Optional[Dict[str, Tuple[Tuple[np.ndarray, ...], np.ndarray]]] = None
+        self.packed: Optional[bytes] = None
+
+
+class SnapshotRing:
+    """Engine snapshots for the last `size` turns, kept in memory for turn_back_time."""
+
+    filename = "snapshots.ring"
+
+    def __init__(self, size: int = 21, directory: Optional[str] = None):
+        self.size = size
+        self.directory = directory
+        self.frames = OrderedDict()
+        self.head: Layers = {}
+        self.store: Optional[SnapshotStore] = None
+
+    def __contains__(self, turn: int) -> bool:
+        return turn in self.frames
+
+    def __getitem__(self, turn: int) -> Tuple[bytes, Layers]:
+        """The pickled engine for `turn` and freshly built copies of its layers."""
+        frame = self.frames[turn]
+        layers = {name: layer.copy(order="K") for name, layer in self.head.items()}
+        for _, layers, _ in self.rewind(turn):
+            pass
+        return frame.data, layers
+
+    def rewind(self, turn: int) -> Iterator[Tuple[int, Layers, list]]:
+        """Yield each turn's number, layers and view stepping back to `turn`, layers updated in place."""
+        layers = {name: layer.copy(order="K") for name, layer in self.head.items()}
+
+        for t in reversed(list(self.frames)[:-1]):
+            if t < turn:
+                break
+            older = self.frames[t]
+            if older.keyframe is not None:
+                layers = unpack_layers(older.keyframe)
+            else:
+                for name, (index, values) in older.delta.items():
+                    layers[name][index] = values
+            yield t, layers, older.view
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.frames)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def add(self, turn: int, data: bytes, layers: Layers, view=None) -> None:
+        delta, whole = diff(layers, self.head) if self.frames else (None, True)
+        if self.frames:
+            previous = self.frames[next(reversed(self.frames))]
+            previous.delta = delta
+            if whole:
+                previous.keyframe = pack_layers(self.head)
+
+        if whole:
+            self.head = {name: layer.copy(order="K") for name, layer in layers.items()}
+        else:
+            # bring the head up to date in place; only the changed cells move
+            for name, (index, _) in delta.items():
+                self.head[name][index] = layers[name][index]
+
+        previous = next(reversed(self.frames), None)
+        self.frames[turn] = Frame(data, view)
+        evicted = []
+        while len(self.frames) > self.size:
+            evicted.append(self.frames.popitem(last=False)[0])
+
+        if self.directory is not None:
+            if self.store is None:
+                # a ring that wasn't loaded belongs to a new game
+                self.store = SnapshotStore.create(self.path, self.size + 1)
+            for t in evicted:
+                self.store.drop(t)
+            if previous in self.frames:
+                self.store.put(previous, self.record(previous))
+            self.store.put(turn, self.record(turn))
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, self.filename)
+
+    def record(self, turn: int) -> bytes:
+        """`turn`'s frame as stored on disk, its data and layers encoded separately."""
+        frame = self.frames[turn]
+        if frame.packed is None:
+            frame.packed = codec.encode(frame.data, "snapshots")
+        keyframe = pack_layers(self.head) if turn == next(reversed(self.frames)) else frame.keyframe
+        layers = codec.encode(pickling.dumps((frame.view, keyframe, frame.delta)), "snapshots")
+        return RECORD.pack(len(frame.packed)) + frame.packed + layers
+
+    @staticmethod
+    def unrecord(record: bytes) -> Frame:
+        """Undo `record`."""
+        split = RECORD.size + RECORD.unpack_from(record)[0]
+        packed = record[RECORD.size:split]
+        frame = Frame(codec.decode(packed))
+        frame.packed = packed
+        frame.view, frame.keyframe, frame.delta = pickling.loads(codec.decode(record[split:]))
+        return frame
+
+    def truncate(self, turn: int) -> None:
+        """Forget every turn after `turn`, leaving it the newest."""
+        newer = [t for t in self.frames if t > turn]
+        if not newer:
+            return
+        if turn not in self.frames:
+            self.clear()
+            return
+
+        _, self.head = self[turn]
+        for t in newer:
+            del self.frames[t]
+        frame = self.frames[turn]
+        frame.keyframe = frame.delta = None
+
+        if self.store is not None:
+            for t in newer:
+                self.store.drop(t)
+            self.store.put(turn, self.record(turn))
+
+    def clear(self) -> None:
+        self.frames.clear()
+        self.head = {}
+        if self.store is not None:
+            self.store.clear()
+
+    def flush(self) -> None:
+        """Push the store file's pages out to disk."""
+        if self.store is not None:
+            self.store.flush()
+
+    def load(self, directory: str, turn: Optional[int] = None) -> None:
+        """Fill the ring from the store in `directory`, dropping turns after `turn`."""
+        self.close()
+        self.directory = directory
+        self.frames.clear()
+        self.head = {}
+        self.store = SnapshotStore.open(self.path)
+        if self.store is None:
+            return
+
+        records = self.store.records()
+        for t in sorted(records)[-self.size:]:
+            self.frames[t] = self.unrecord(records[t])
+
+        if self.frames:
+            newest = self.frames[next(reversed(self.frames))]
+            self.head, newest.keyframe = unpack_layers(newest.keyframe), None
+        if turn is not None:
+            self.truncate(turn)
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def delete(self) -> None:
+        """Forget every turn and remove the store file."""
+        self.frames.clear()
+        self.head = {}
+        self.close()
+        if self.directory is None:
+            return
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        # per-turn files from older versions
+        for f in glob.glob(os.path.join(self.directory, "snapshot_*.sav")):
+            os.remove(f)
+
+
+class SnapshotStore:
+    """A preallocated, memory-mapped file of fixed-size slots mirroring a SnapshotRing."""
+
+    MAGIC = b"BSNR"
+    VERSION = 1
+    EMPTY = -1
+    HEADER = struct.Struct("<4sHII")  # magic, version, slots, slot size
+    ENTRY = struct.Struct("<qIQIB")  # turn, generation, offset, length, codec
+
+    def __init__(self, filename: str, f, slots: int, slot_size: int):
+        self.filename = filename
+        self.file = f
+        self.slots = slots
+        self.slot_size = slot_size
+        self.map = mmap.mmap(f.fileno(), 0)
+        self.generation = max((e[1] for e in self.entries()), default=0)
+
+    @property
+    def data_start(self) -> int:
+        return self.HEADER.size + self.slots * self.ENTRY.size
+
+    @classmethod
+    def create(cls, filename: str, slots: int, slot_size: int = 1 << 16) -> SnapshotStore:
+        """A new empty store replacing `filename`, which nothing may still have open."""
+        f = open(filename, "w+b")
+        f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, slots, slot_size))
+        for slot in range(slots):
+            f.write(cls.ENTRY.pack(cls.EMPTY, 0, 0, 0, 0))
+        f.truncate(cls.HEADER.size + slots * cls.ENTRY.size + slots * slot_size)
+        f.flush()
+        return cls(filename, f, slots, slot_size)
+
+    @classmethod
+    def open(cls, filename: str) -> Optional[SnapshotStore]:
+        """The store at `filename`, or None if there isn't a usable one."""
+        if not os.path.exists(filename):
+            return None
+        f = open(filename, "r+b")
+        header = f.read(cls.HEADER.size)
+        if len(header) == cls.HEADER.size:
+            magic, version, slots, slot_size = cls.HEADER.unpack(header)
+            if magic == cls.MAGIC and version == cls.VERSION:
+                return cls(filename, f, slots, slot_size)
+        f.close()
+        return None
+
+    def entries(self) -> List[Tuple[int, int, int, int, int]]:
+        return [
+            self.ENTRY.unpack_from(self.map, self.HEADER.size + slot * self.ENTRY.size)
+            for slot in range(self.slots)
+        ]
+
+    def set_entry(self, slot: int, *entry) -> None:
+        self.ENTRY.pack_into(self.map, self.HEADER.size + slot * self.ENTRY.size, *entry)
+
+    def records(self) -> Dict[int, bytes]:
+        """The newest record for each turn in the store."""
+        newest = {}
+        for turn, generation, offset, length, _ in self.entries():
+            if turn != self.EMPTY and generation >= newest.get(turn, (-1,))[0]:
+                newest[turn] = (generation, offset, length)
+        return {turn: self.map[offset:offset+length] for turn, (_, offset, length) in newest.items()}
+
+    def put(self, turn: int, record: bytes) -> None:
+        if len(record) > self.slot_size:
+            self.grow(len(record))
+        entries = self.entries()
+        slot = next(i for i, e in enumerate(entries) if e[0] == self.EMPTY)
+        offset = self.data_start + slot * self.slot_size
+        self.map[offset:offset+len(record)] = record
+
+        self.generation += 1
+        family = record[RECORD.size + len(codec.MAGIC)]
+        self.set_entry(slot, turn, self.generation, offset, len(record), family)
+        for i, e in enumerate(entries):
+            if e[0] == turn:
+                self.set_entry(i, self.EMPTY, 0, 0, 0, 0)
+
+    def drop(self, turn: int) -> None:
+        for i, e in enumerate(self.entries()):
+            if e[0] == turn:
+                self.set_entry(i, self.EMPTY, 0, 0, 0, 0)
+
+    def clear(self) -> None:
+        for i in range(self.slots):
+            self.set_entry(i, self.EMPTY, 0, 0, 0, 0)
+
+    def grow(self, length: int) -> None:
+        """Rebuild the file with slots big enough for a `length`-byte record."""
+        records = self.records()
+        slot_size = self.slot_size
+        while slot_size < length:
+            slot_size *= 2
+        # built beside this file and swapped in once whole, so a crash
+        # partway through leaves the old one
+        temp = self.filename + ".tmp"
+        grown = self.create(temp, self.slots, slot_size)
+        for turn in sorted(records):
+            grown.put(turn, records[turn])
+        grown.flush()
+        grown.close()
+        self.close()
+        os.replace(temp, self.filename)
+        self.__dict__.update(self.open(self.filename).__dict__)
+
+    def flush(self) -> None:
+        self.map.flush()
+
+    def close(self) -> None:
+        self.map.close()
+        self.file.close()
+
+
+def diff(new: Layers, old: Layers):
+    """The cells of `old` that differ from `new`, and whether to keep `old` whole instead."""
+    delta = {}
+    for name, layer in old.items():
+        if name not in new or new[name].shape != layer.shape:
+            return None, True
+        index = np.nonzero(changed(new[name], layer))
+        if len(index[0]) * 2 > layer.size:
+            return None, True
+        delta[name] = (index, layer[index])
+    return delta, False
+
+
+def changed(new: np.ndarray, old: np.ndarray) -> np.ndarray:
+    """Which cells differ between two layers of the same shape."""
+    if not new.dtype.names:
+        return new != old
+
+    # compare structured cells (tiles) as raw bytes rather than field by field
+    def raw(a):
+        a = a.T if a.flags.f_contiguous else np.ascontiguousarray(a)
+        return a.view(np.uint8).reshape(a.shape + (-1,))
+
+    if new.flags.f_contiguous != old.flags.f_contiguous:
+        old = np.asarray(old, order="F" if new.flags.f_contiguous else "C")
+
+    mask = (raw(new) != raw(old)).any(axis=-1)
+    return mask.T if new.flags.f_contiguous else mask
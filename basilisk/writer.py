@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from typing import Callable, Optional
+
+from basilisk import codec
+
+
+class BackgroundWriter:
+    """Runs the slow half of saving on one background thread, in the order submitted."""
+
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(target=self.run, name="basilisk-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, job: Callable, *args) -> None:
+        self.jobs.put((job, args))
+
+    def run(self) -> None:
+        while True:
+            job, args = self.jobs.get()
+            try:
+                job(*args)
+            except BaseException as e:
+                if self.error is None:
+                    self.error = e
+            finally:
+                self.jobs.task_done()
+
+    def flush(self) -> None:
+        """Wait for everything submitted so far to finish."""
+        self.jobs.join()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+
+_writer: Optional[BackgroundWriter] = None
+
+
+def get_writer() -> BackgroundWriter:
+    """The writer shared by every engine in this process."""
+    global _writer
+    if _writer is None:
+        _writer = BackgroundWriter()
+    return _writer
+
+
+def write_encoded(filename: str, data: bytes, kind: str, header: bytes = b"") -> None:
+    """Write `data` encoded for its `kind` of file, atomically, after `header`."""
+    temp = filename + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(header)
+        f.write(codec.encode(data, kind))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, filename)
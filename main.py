@@ -11,9 +11,18 @@ import utils
 
 
 def save_game(handler: input_handlers.BaseEventHandler, filename: str) -> None:
-    """If the current event handler has an active Engine then save it."""
-    if isinstance(handler, input_handlers.EventHandler):
-        handler.engine.save_as(filename)
+    """If the current event handler has an active Engine then save it to disk."""
+    # menus' confirm prompts are EventHandlers without an engine
+    engine = getattr(handler, "engine", None)
+    if engine is not None:
+        engine.save_as(filename)
+        engine.writer.flush()
+
+def close_game(handler: input_handlers.BaseEventHandler) -> None:
+    """Let go of the current game's open files before leaving it."""
+    engine = getattr(handler, "engine", None)
+    if engine is not None:
+        engine.close()
 
 def toggle_fullscreen(context: tcod.context.Context) -> None:
     """Toggle a context window between fullscreen and windowed modes."""
@@ -51,13 +60,28 @@ def main() -> None:
                 toggle_fullscreen(context)
             try:
                 while True:
-                    root_console.clear()
-                    handler.on_render(console=root_console)
+                    # play back anything the last turn animated before drawing the game again
+                    engine = getattr(handler, "engine", None)
+                    timeline = engine.timeline if engine is not None else None
+                    frame = timeline.frame() if timeline else None
+                    if frame is not None:
+                        root_console.tiles_rgb[...] = frame
+                    else:
+                        root_console.clear()
+                        handler.on_render(console=root_console)
                     context.present(root_console, integer_scaling=True, clear_color=(10,10,10))
+                    setup_game.save_settings_if_due()
 
                     try:
                         for event in tcod.event.get():
                             context.convert_event(event)
+                            if frame is not None and isinstance(event, (tcod.event.KeyDown, tcod.event.MouseButtonDown)):
+                                # acting again cuts the animation short; anything drawn
+                                # over the console next should start from the live game
+                                timeline.skip()
+                                frame = None
+                                root_console.clear()
+                                handler.on_render(console=root_console)
                             handler = handler.handle_events(event)
 
                     except exceptions.VictoryAnimation as v:
@@ -78,9 +102,13 @@ def main() -> None:
 
                     except exceptions.QuitToMenu:
                         save_game(handler, utils.get_resource("savegame.sav"))
+                        setup_game.flush_settings()
+                        close_game(handler)
                         handler = setup_game.MainMenu(context,root_console)
 
                     except exceptions.QuitWithoutSaving:
+                        setup_game.flush_settings()
+                        close_game(handler)
                         handler = setup_game.MainMenu(context,root_console)
 
                     except Exception:  # Handle exceptions in game.
@@ -93,9 +121,11 @@ def main() -> None:
 
             except SystemExit:  # Save and quit.
                 save_game(handler, utils.get_resource("savegame.sav"))
+                setup_game.flush_settings()
                 raise
             except BaseException:  # Save on any other unexpected exception.
                 save_game(handler, utils.get_resource("savegame.sav"))
+                setup_game.flush_settings()
                 raise
 
 